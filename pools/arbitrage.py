@@ -0,0 +1,196 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Arbitrage cycle detection
+
+each pool is a pair of directed edges weighted -log(marginal rate after the
+taker fee), so a cycle of trades that returns more than it spends is a
+negative cycle; SPFA from a virtual source at distance 0 to every asset
+finds one, and after a few pools change only the paths through those
+pools are relaxed again instead of the whole graph
+"""
+
+# STANDARD PYTHON MODULES
+import math
+from collections import defaultdict, deque
+from json import dumps as json_dumps
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import MAX_CYCLES
+
+
+def edge_rates(weight):
+    """
+    :return: the marginal a->b and b->a rates of one pool after its taker fee
+    """
+    if not (weight["balance_a"] and weight["balance_b"]):
+        # an empty pool quotes a meaningless price and cannot be traded through
+        return 0.0, 0.0
+    keep = 1 - weight.get("taker_fee", 0)
+    return weight["inverse"] * keep, weight["price"] * keep
+
+
+class ArbitrageGraph:
+    """
+    incremental negative cycle search over the pool graph
+
+    distances and the shortest path tree are kept between updates; a cheaper
+    edge only re-relaxes from its tail, a dearer edge resets the subtree
+    that hung from it; while a cycle exists distances are unbounded, so the
+    next search after a find starts over from scratch
+    """
+
+    def __init__(self):
+        # (pool_id, direction): (from asset, to asset, -log rate)
+        self.edges = {}
+        self.out = defaultdict(set)
+        self.into = defaultdict(set)
+        self.dist = {}
+        self.pred = {}
+        self.seeds = set()
+        self.dirty = True
+
+    def update(self, weights):
+        """
+        add or re-weight the pools in a cache_weights style list
+        """
+        for weight in weights:
+            pool, asset_a, asset_b = weight["pool_id"], weight["asset_a"], weight["asset_b"]
+            for key, (tail, head), rate in zip(
+                [(pool, 0), (pool, 1)],
+                [(asset_a, asset_b), (asset_b, asset_a)],
+                edge_rates(weight),
+            ):
+                cost = -math.log(rate) if rate > 0 else math.inf
+                old = self.edges.get(key)
+                self.edges[key] = (tail, head, cost)
+                self.out[tail].add(key)
+                self.into[head].add(key)
+                for asset in (tail, head):
+                    if asset not in self.dist:
+                        self.dist[asset] = 0.0
+                        self.seeds.add(asset)
+                if old is None or cost < old[2]:
+                    self.seeds.add(tail)
+                elif cost > old[2] and self.pred.get(head) == key:
+                    self.reset(head)
+
+    def reset(self, root):
+        """
+        return every asset whose shortest path runs through root to the
+        virtual source, then queue every edge into them for relaxation
+        """
+        children = defaultdict(list)
+        for asset, key in self.pred.items():
+            children[self.edges[key][0]].append(asset)
+        stack = [root]
+        while stack:
+            asset = stack.pop()
+            self.dist[asset] = 0.0
+            self.pred.pop(asset, None)
+            self.seeds.update(self.edges[key][0] for key in self.into[asset])
+            stack.extend(children.pop(asset, []))
+
+    def restart(self):
+        """
+        forget every distance, all assets become seeds
+        """
+        self.dist = dict.fromkeys(self.dist, 0.0)
+        self.pred = {}
+        self.seeds = set(self.dist)
+        self.dirty = False
+
+    def search(self, banned=()):
+        """
+        SPFA from the queued seeds; every asset count of relaxations the
+        predecessor graph is checked for a loop, which can only be negative
+        :return: the edge keys of one negative cycle, or None
+        """
+        limit, relaxed = len(self.dist), 0
+        queue = deque(self.seeds)
+        queued = set(self.seeds)
+        self.seeds = set()
+        while queue:
+            tail = queue.popleft()
+            queued.discard(tail)
+            for key in self.out[tail]:
+                if key in banned:
+                    continue
+                _, head, cost = self.edges[key]
+                if self.dist[tail] + cost < self.dist[head] - 1e-12:
+                    self.dist[head] = self.dist[tail] + cost
+                    self.pred[head] = key
+                    relaxed += 1
+                    if relaxed % limit == 0 and (cycle := self.loop()):
+                        return cycle
+                    if head not in queued:
+                        queue.append(head)
+                        queued.add(head)
+        return None
+
+    def loop(self):
+        """
+        walk every predecessor chain once, colouring each walk
+        :return: the edge keys of the first loop found in trading order, or None
+        """
+        walk = {}
+        for start in self.pred:
+            asset = start
+            while asset in self.pred and asset not in walk:
+                walk[asset] = start
+                asset = self.edges[self.pred[asset]][0]
+            if walk.get(asset) == start and asset in self.pred:
+                # this walk ran into itself
+                cycle, head = [], asset
+                while True:
+                    key = self.pred[asset]
+                    cycle.append(key)
+                    asset = self.edges[key][0]
+                    if asset == head:
+                        return cycle[::-1]
+        return None
+
+    def cycles(self):
+        """
+        find up to MAX_CYCLES profitable cycles; each find bans its dearest
+        edge and searches again from scratch for another
+        :return: [{"pools": [...], "assets": [...], "profit": float}]
+        """
+        if self.dirty:
+            self.restart()
+        found, banned = [], set()
+        cycle = self.search()
+        while cycle is not None:
+            found.append(self.describe(cycle))
+            banned.add(max(cycle, key=lambda key: self.edges[key][2]))
+            self.dirty = True
+            if len(found) >= MAX_CYCLES:
+                break
+            self.restart()
+            cycle = self.search(banned)
+        if found:
+            # distances were unbounded while the cycles existed
+            self.dirty = True
+        return found
+
+    def describe(self, cycle):
+        """
+        a json friendly view of one cycle of edge keys
+        """
+        return {
+            "pools": [key[0] for key in cycle],
+            "assets": [self.edges[key][0] for key in cycle] + [self.edges[cycle[0]][0]],
+            "profit": math.exp(-sum(self.edges[key][2] for key in cycle)) - 1,
+        }
+
+
+def export_cycles(cycles, path):
+    """
+    write the cycles found as json
+    """
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(json_dumps(cycles, indent=1))
@@ -0,0 +1,227 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+End to end benchmark
+
+runs the whole data path, pool scan, names, tickers, weights, feeds,
+arbitrage, map and a routed order, against local mock nodes, first on an empty cache
+and then again on the cache it left; reports wall time, rpc calls and
+bytes for each run and saves them to benchmark.json
+
+with --notices the mock nodes push subscription notices, and watch mode
+then the order books follow them for that many seconds each on the warm
+cache; books that drift from the mock chain are counted as stale orders;
+with --fixture the mocks answer from a saved chain instead of a synthetic one
+
+    python3 benchmark.py --pools 2000 --latency 0.05
+"""
+
+# STANDARD PYTHON MODULES
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from json import dumps as json_dumps
+
+# LIQUIDITY POOL MAPPER MODULES
+import store
+from arbitrage import ArbitrageGraph
+from history import HISTORY
+from metrics import METRICS
+from mock_node import MockNode, load_fixture, synthetic_chain
+from nodes import NodePool
+from orderbook import OrderBooks
+from pool_mapper import collect, map_network, watch_network
+from routing import Router
+from rpc import SIZERS
+
+
+async def timed_run(mocks, label):
+    """
+    one full pass of the mapper against the mock nodes
+    :return: the report for this run
+    """
+    for mock in mocks:
+        mock.calls, mock.bytes_in, mock.bytes_out = Counter(), 0, 0
+    # batch sizes are learned afresh by every run of the mapper
+    SIZERS.clear()
+    METRICS.reset()
+    wall = {}
+    start = time.perf_counter()
+    rpc = await NodePool(nodes=[mock.url for mock in mocks]).connect()
+    wall["connect"] = time.perf_counter() - start
+    mark = time.perf_counter()
+    weights, name_cache, ticker_cache, feeds = await collect(rpc)
+    wall["collect"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    arbitrage = ArbitrageGraph()
+    arbitrage.update(weights)
+    cycles = arbitrage.cycles()
+    wall["arbitrage"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    highlight = {pool for cycle in cycles for pool in cycle["pools"]}
+    map_network(
+        weights, name_cache, ticker_cache, feeds, 0, 1, highlight=highlight, show=False
+    )
+    wall["map_network"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    Router(store.read_pools(), name_cache).split("1.3.0", "1.3.1", 50000)
+    wall["routing"] = time.perf_counter() - mark
+    await rpc.close()
+    wall["total"] = time.perf_counter() - start
+    calls = sum((mock.calls for mock in mocks), Counter())
+    return {
+        "run": label,
+        "wall": {key: round(value, 4) for key, value in wall.items()},
+        "rpc_calls": sum(calls.values()),
+        "calls_by_method": dict(calls),
+        "bytes_sent": sum(mock.bytes_in for mock in mocks),
+        "bytes_received": sum(mock.bytes_out for mock in mocks),
+        "pools": len(weights),
+        "metrics": METRICS.report(),
+    }
+
+
+async def notice_run(mocks, seconds):
+    """
+    watch mode, then the order books, on the warm cache, each following
+    the notices the mocks push
+    :return: the report for this run
+    """
+    for mock in mocks:
+        mock.notices = Counter()
+    rpc = await NodePool(nodes=[mock.url for mock in mocks]).connect()
+    weights, name_cache, ticker_cache, feeds = await collect(rpc)
+    arbitrage = ArbitrageGraph()
+    arbitrage.update(weights)
+    max_w, pool_ids = map_network(
+        weights, name_cache, ticker_cache, feeds, 0, 1, show=False
+    )
+    try:
+        await asyncio.wait_for(
+            watch_network(
+                rpc, pool_ids, name_cache, ticker_cache, max_w, 1, arbitrage
+            ),
+            seconds,
+        )
+    except asyncio.TimeoutError:
+        pass
+    books = OrderBooks(weights, name_cache)
+    node = await rpc.pick()
+    await books.load(rpc.live[node])
+    try:
+        await asyncio.wait_for(books.follow(rpc.live[node]), seconds)
+    except asyncio.TimeoutError:
+        pass
+    # stop the notices, then let the books take in those already sent
+    for mock in mocks:
+        mock.subscriptions.clear()
+    try:
+        await asyncio.wait_for(books.follow(rpc.live[node]), 0.5)
+    except asyncio.TimeoutError:
+        pass
+    await rpc.close()
+    # every mock answers from the same chain, which their notices change
+    chain = mocks[0].objects
+    orders = {k: v for book in books.books.values() for k, v in book.orders.items()}
+    stale = [
+        k
+        for k, v in chain.items()
+        if k.startswith("1.7.") and orders.get(k, v) != v
+    ] + [k for k in orders if k not in chain]
+    return {
+        "run": "notices",
+        "seconds": seconds,
+        "notices": sum(sum(mock.notices.values()) for mock in mocks),
+        "orders": len(orders),
+        "stale_orders": len(stale),
+    }
+
+
+async def benchmark(args):
+    """
+    cold and warm runs against fresh mock nodes and a throwaway cache
+    :return: [cold report, warm report]
+    """
+    chain = (
+        load_fixture(args.fixture)
+        if args.fixture
+        else synthetic_chain(args.pools, args.assets, args.seed)
+    )
+    mocks = [
+        await MockNode(
+            chain,
+            latency=args.latency,
+            max_batch=args.max_batch,
+            error_rate=args.error_rate,
+            drop_rate=args.drop_rate,
+            seed=args.seed + idx,
+            notice_interval=0.05 if args.notices else None,
+        ).start()
+        for idx in range(args.nodes)
+    ]
+    home = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # keep the real pipe cache and map files out of the benchmark
+            store.PATH, store.DATABASE = tmp, f"{tmp}/cache.db"
+            for name, series in HISTORY.items():
+                series.path, series.last = f"{tmp}/history/{name}", None
+            os.chdir(tmp)
+            reports = [
+                await timed_run(mocks, "cold"),
+                await timed_run(mocks, "warm"),
+            ]
+            if args.notices:
+                reports.append(await notice_run(mocks, args.notices))
+            os.chdir(home)
+    finally:
+        os.chdir(home)
+        for mock in mocks:
+            await mock.close()
+    return reports
+
+
+def main():
+    """
+    parse the mock chain and node settings, run, print and save the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[3])
+    parser.add_argument("--pools", type=int, default=300)
+    parser.add_argument("--assets", type=int, default=120)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-batch", type=int, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--notices", type=float, default=0.0)
+    # a saved {object_id: object} chain in place of the synthetic one
+    parser.add_argument("--fixture")
+    reports = asyncio.run(benchmark(parser.parse_args()))
+    for report in reports:
+        if report["run"] == "notices":
+            print(
+                "notices  {notices} followed in {seconds}s each, "
+                "{orders} orders in the books, {stale_orders} stale".format(**report)
+            )
+            continue
+        print(
+            "{run:>5}  {total:8.3f}s  {rpc_calls:6d} calls  "
+            "{bytes_sent:10d}B sent  {bytes_received:10d}B received".format(
+                **report, total=report["wall"]["total"]
+            )
+        )
+        print("       " + json_dumps(report["wall"]))
+    with open("benchmark.json", "w", encoding="utf-8") as handle:
+        handle.write(json_dumps(reports, indent=1))
+
+
+if __name__ == "__main__":
+    main()
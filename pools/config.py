@@ -35,13 +35,19 @@ NODES = [
     "wss://api.bts.btspp.io:10100/ws",
     "wss://singapore.bitshares.im/ws",
 ]
-# menu option to exclude these from the map
-DETACH = [
-    "1.3.6008",  # NSNFT
-    "1.3.6009",  # NUISHI
-]
+# "record" saves every rpc result to RPC_ARCHIVE, "replay" serves them offline;
+# record with the pipe cache cleared, only uncached calls are recorded
+RPC_MODE = None
+# gzipped json chain snapshot, relative paths are beside this file
+RPC_ARCHIVE = "rpc_archive.json.gz"
+# folder of the pool and ticker history, relative paths are beside this file
+HISTORY_PATH = "history"
+# seconds of history in each segment of the history store
+HISTORY_SEGMENT = 86400
+# menu option to exclude the assets of these TAXONOMY groups from the map
+DETACH = {"nft"}
 # menu option to network map only these pools
-ATTACH = [
+ATTACH = {
     # HONEST pools:
     "1.19.43",  # USD:BTS
     "1.19.65",  # BTC:USD
@@ -51,13 +57,31 @@ ATTACH = [
     "1.19.291",  # USDSHORT:BTS
     "1.19.292",  # BTCSHORT:BTS
     "1.19.293",  # BTCSHORT:USDSHORT
-]
+}
 # PyVis Buttons
 BUTTONS = ["physics", "edges", "nodes"]
-# when making object rpc calls this many objects per call
-CHUNK = 10
+# first batch size tried on each node for get_objects and get_liquidity_pools
+BATCH_START = 100
+# never grow a batch beyond this many objects
+BATCH_MAX = 2000
+# shrink batches whose responses would grow beyond this many bytes
+BATCH_BYTES = 2**20
+# failed batches one batched call retries, in total, before it gives up
+BATCH_RETRIES = 16
+# maximum concurrent requests in flight on one asyncio websocket
+INFLIGHT = 32
+# keep warm connections to this many of the best ranked NODES
+WARM_NODES = 3
+# seconds allowed to connect and answer the ranking probe
+PROBE_TIMEOUT = 3
+# seconds allowed for any single rpc call before failing over
+RPC_TIMEOUT = 10
+# attempts per rpc call, each on the best available node
+RETRIES = 4
 # pixel height of network map
 HEIGHT = 2160
+# force directed layout iterations when the pool topology changes
+LAYOUT_ITERATIONS = 200
 # asset groups
 COLOR = [
     "#8e7cc3",  # purple
@@ -71,6 +95,75 @@ COLOR = [
     "#bc9b05",  # gold
     "#e06666",  # red
 ]
+# asset groups by color, the first group whose rules match an asset wins;
+# rules are symbol "prefix", "suffix", "contains" or exact "symbols" lists,
+# a full match regex "pattern", issuer account names and explicit asset ids
+TAXONOMY = [
+    {"name": "honest", "color": COLOR[0], "contains": ["HONEST"]},
+    {"name": "gdex", "color": COLOR[1], "contains": ["GDEX"], "symbols": ["DEFI", "GAT"]},
+    {
+        "name": "core",
+        "color": COLOR[2],
+        "symbols": ["GOLD", "SILVER", "CNY 1.0"],
+        "pattern": "...",
+    },
+    {"name": "twentix", "color": COLOR[3], "contains": ["BTWTY", "TWENTIX"]},
+    {"name": "iob", "color": COLOR[4], "contains": ["IOB"]},
+    {"name": "crude", "color": COLOR[5], "contains": ["CRUDE"]},
+    {"name": "xbtsx", "color": COLOR[6], "contains": ["XBTSX"], "issuers": ["xbtsx"]},
+    {
+        "name": "nft",
+        "color": COLOR[7],
+        "symbols": ["NIUSHI", "NSNFT"],
+        "assets": ["1.3.6008", "1.3.6009"],
+    },
+    {"name": "gold", "color": COLOR[8], "symbols": ["GOLDBACK", "QUINT", "BEOS"]},
+    {"name": "other", "color": COLOR[9], "pattern": ".*"},
+]
+# localhost port that pushes live watch updates to the open map
+WATCH_PORT = 8765
+# seconds before a cached BTS ticker price is fetched again
+TICKER_TTL = 3600
+# seconds before a cached MPA feed price is fetched again
+FEED_TTL = 600
+# bitassets whose feeds value every asset in these units on the map
+REFERENCE_FEEDS = {"USD": "2.4.294", "BTC": "2.4.295"}
+# stop after finding this many arbitrage cycles in one search
+MAX_CYCLES = 10
+# edge color of pools in a profitable arbitrage cycle
+ARBITRAGE_COLOR = "#ff00ff"
+# dump a cProfile of each stage that runs alone to the pipe folder
+PROFILE = False
+# orders fetched per market when a book is first loaded, nodes cap this at 300
+BOOK_DEPTH = 300
+# seconds between renders of the live order books
+BOOK_RENDER = 10
+# depth charts span this fraction below the mid price, and the inverse above
+DEPTH_RANGE = 0.5
+# price levels on each side of a depth chart
+DEPTH_LEVELS = 50
+# blocks back from the last irreversible block the first transfer scan starts
+TRANSFER_BLOCKS = 28800
+# blocks fetched concurrently, then checkpointed together
+TRANSFER_CHUNK = 500
+# map only this many of the largest account to account flows
+TRANSFER_EDGES = 1000
+# "auto" prunes and clusters maps of more than LOD_NODES assets,
+# "prune" or "cluster" always does one of them, "full" maps everything
+LEVEL_OF_DETAIL = "auto"
+LOD_NODES = 300
+# the level of detail prunes pools below this percentile of balance weight
+PRUNE_PERCENTILE = 25
+# fold leaf assets into a cluster node when a hub has this many in one family
+CLUSTER_MIN = 3
+# pools allowed in one simulated trade route
+ROUTE_HOPS = 3
+# candidate routes kept, by best marginal rate, when splitting an order
+ROUTE_PATHS = 20
+# slices an order is filled in when splitting it across routes
+ROUTE_STEPS = 200
+# trade sizes, a decade apart up to the order, in the slippage grid
+ROUTE_GRID = 7
 # scale the line thickness
 SCALE_WEIGHT = 80
 # detach the unfunded pools from the network map
@@ -0,0 +1,110 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Level of detail
+
+prunes the pools below a liquidity percentile and gathers the leaf
+assets hanging off the same hub, by taxonomy group, into cluster nodes
+that open on click; "auto" does both once a map has more than LOD_NODES
+assets, "prune" and "cluster" do one always, and "full" neither
+"""
+
+# STANDARD PYTHON MODULES
+from collections import defaultdict
+from json import dumps as json_dumps
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import CLUSTER_MIN, LEVEL_OF_DETAIL, LOD_NODES, PRUNE_PERCENTILE
+
+
+def prune_edges(edges, keep=(), percentile=PRUNE_PERCENTILE):
+    """
+    drop the pools whose balance weight is below a percentile of all of them
+    :param keep: pool ids never pruned, such as arbitrage highlights
+    :return: the remaining edges
+    """
+    if not edges or not percentile:
+        return edges
+    cut = np.percentile([i["wt_balance"] for i in edges], percentile)
+    return [i for i in edges if i["wt_balance"] >= cut or i["pool_id"] in keep]
+
+
+def leaf_clusters(edges, families, size=CLUSTER_MIN):
+    """
+    group the assets whose pools all lead to one hub asset by that hub and
+    their taxonomy group; groups smaller than size are left alone
+    :param families: {asset: taxonomy group name}
+    :return: {asset: cluster id}
+    """
+    neighbors = defaultdict(set)
+    for edge in edges:
+        neighbors[edge["asset_a"]].add(edge["asset_b"])
+        neighbors[edge["asset_b"]].add(edge["asset_a"])
+    groups = defaultdict(list)
+    for asset, linked in neighbors.items():
+        hub = next(iter(linked))
+        # two assets that only trade with each other are not a hub and a leaf
+        if len(linked) == 1 and len(neighbors[hub]) > 1:
+            groups[(hub, families[asset])].append(asset)
+    return {
+        asset: f"{hub} {family}"
+        for (hub, family), members in groups.items()
+        if len(members) >= size
+        for asset in members
+    }
+
+
+def level_of_detail(edges, families, assets, keep=(), mode=LEVEL_OF_DETAIL):
+    """
+    apply a level of detail mode to the edges of a map
+    :param assets: the number of assets on the map, "auto" compares it to LOD_NODES
+    :return: (edges, {asset: cluster id}), or None in place of the edges
+        when every asset should still be drawn
+    """
+    prune = mode == "prune" or (mode == "auto" and assets > LOD_NODES)
+    cluster = mode == "cluster" or (mode == "auto" and assets > LOD_NODES)
+    if not (prune or cluster):
+        return None, {}
+    if prune:
+        edges = prune_edges(edges, keep)
+    return edges, leaf_clusters(edges, families) if cluster else {}
+
+
+def cluster_script(clusters, labels, colors):
+    """
+    :return: html that folds each cluster into one node of the pyvis network,
+        which opens back into its assets when clicked
+    """
+    members = defaultdict(list)
+    for asset, cluster in clusters.items():
+        members[cluster].append(asset)
+    meta = {
+        cluster: {
+            "id": f"cluster {cluster}",
+            "label": f"{len(assets)} assets",
+            "title": "\n".join(sorted(labels[i] for i in assets)),
+            "color": colors[assets[0]],
+            "shape": "dot",
+            "size": 10 + len(assets) ** 0.5,
+        }
+        for cluster, assets in members.items()
+    }
+    return (
+        "<script>"
+        f"const clusters = {json_dumps(meta)};"
+        f"const membership = {json_dumps(clusters)};"
+        "for (const [cid, props] of Object.entries(clusters)) {"
+        "network.cluster({joinCondition: (node) => membership[node.id] === cid,"
+        "clusterNodeProperties: props});}"
+        "network.on('click', (params) => {"
+        "if (params.nodes.length === 1 && network.isCluster(params.nodes[0])) {"
+        "network.openCluster(params.nodes[0]);}});"
+        "</script>"
+    )
@@ -0,0 +1,143 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Market pegged asset feeds
+
+every asset in the pool graph is checked once for a bitasset, then the
+median feeds of all market pegged assets whose cached feed is older than
+FEED_TTL are fetched in one batched get_objects call; precisions come
+from the name_cache, so a refresh costs one call, two when new assets
+or backing assets have to be looked up first
+"""
+
+# STANDARD PYTHON MODULES
+import time
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import FEED_TTL, REFERENCE_FEEDS
+from metrics import METRICS
+from rpc import arpc_get_objects
+from store import write_assets, write_feeds
+from utilities import NIL, asset_entry, dprint
+
+
+def stale_feeds(feed_cache, asset_ids, ttl=FEED_TTL, now=None):
+    """
+    :return: (asset ids never checked for a bitasset,
+        bitasset ids whose feed is missing or older than ttl seconds)
+    """
+    now = now or time.time()
+    unchecked = sorted(i for i in set(asset_ids) if i not in feed_cache)
+    expired = sorted(
+        {
+            entry["bitasset"]
+            for entry in feed_cache.values()
+            if entry["bitasset"] is not None and now - entry["time"] > ttl
+        }
+    )
+    return unchecked, expired
+
+
+def feed_price(bitasset, name_cache):
+    """
+    the median feed of a bitasset object in MPA units per backing asset unit
+    :return: (asset id, backing asset id, price or None without a feed)
+    """
+    asset = bitasset["asset_id"]
+    backing = bitasset["options"]["short_backing_asset"]
+    feed = bitasset["median_feed"]["settlement_price"]
+    amounts = {
+        side["asset_id"]: int(side["amount"])
+        / 10 ** int(name_cache[side["asset_id"]]["precision"])
+        for side in (feed["base"], feed["quote"])
+    }
+    if not amounts.get(asset) or not amounts.get(backing):
+        return asset, backing, None
+    return asset, backing, amounts[asset] / amounts[backing]
+
+
+async def refresh_feeds(rpc, feed_cache, name_cache, asset_ids, ttl=FEED_TTL):
+    """
+    check new assets for a bitasset and fetch every stale feed, including
+    the REFERENCE_FEEDS, batched into as few get_objects calls as possible
+    :return: the updated feed_cache of {asset_id: {"bitasset", "backing",
+        "price", "time"}}, where bitasset is None for an asset that is not
+        market pegged
+    """
+    unchecked, expired = stale_feeds(feed_cache, asset_ids, ttl)
+    known = {entry["bitasset"] for entry in feed_cache.values()}
+    expired = sorted(set(expired) | (set(REFERENCE_FEEDS.values()) - known))
+    now = time.time()
+    changes = {}
+    if unchecked:
+        assets = await arpc_get_objects(rpc, unchecked)
+        for asset_id in unchecked:
+            bitasset = assets.get(asset_id, {}).get("bitasset_data_id")
+            changes[asset_id] = {
+                "bitasset": bitasset,
+                "backing": None,
+                "price": None,
+                "time": now,
+            }
+            if bitasset is not None:
+                expired.append(bitasset)
+    METRICS.cache("feeds", len(set(asset_ids)) - len(unchecked), len(unchecked))
+    dprint("\nstale feeds", expired)
+    bitassets = await arpc_get_objects(rpc, sorted(set(expired)))
+    # the assets named in a feed are usually in the name_cache already
+    missing = sorted(
+        {
+            side["asset_id"]
+            for bitasset in bitassets.values()
+            for side in bitasset["median_feed"]["settlement_price"].values()
+        }
+        - set(name_cache.keys())
+    )
+    if missing:
+        found = {
+            k: asset_entry(v) for k, v in (await arpc_get_objects(rpc, missing)).items()
+        }
+        name_cache.update(found)
+        write_assets(found)
+    for bitasset_id, bitasset in bitassets.items():
+        asset, backing, price = feed_price(bitasset, name_cache)
+        changes[asset] = {
+            "bitasset": bitasset_id,
+            "backing": backing,
+            "price": price,
+            "time": now,
+        }
+    feed_cache.update(changes)
+    write_feeds(changes)
+    return feed_cache
+
+
+def reference_feeds(feed_cache):
+    """
+    :return: {name: feed price} of the REFERENCE_FEEDS, in units per BTS
+    """
+    by_bitasset = {entry["bitasset"]: entry for entry in feed_cache.values()}
+    return {
+        name: (by_bitasset.get(bitasset) or {}).get("price") or NIL
+        for name, bitasset in REFERENCE_FEEDS.items()
+    }
+
+
+def feed_premiums(feed_cache, prices):
+    """
+    how far the pools price each market pegged asset above its feed
+    :param prices: {asset_id: asset units per BTS} through the pools
+    :return: {asset_id: premium}, 0.01 is a 1% premium, -0.01 a 1% discount
+    """
+    premiums = {}
+    for asset, entry in feed_cache.items():
+        backing = entry["backing"]
+        if entry["price"] and prices.get(asset) and prices.get(backing):
+            # the feed in asset per BTS, through the pool price of its backing
+            feed = entry["price"] * prices[backing]
+            premiums[asset] = feed / prices[asset] - 1
+    return premiums
@@ -0,0 +1,215 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Columnar pool and ticker history
+
+an append only time series per object space: pool balances and 24h
+volumes keyed by 1.19.x instance, BTS tickers keyed by 1.3.x instance;
+only values that changed since the last snapshot are appended, as rows
+of one raw binary file per column, in one folder per HISTORY_SEGMENT
+
+every segment opens with a keyframe of all last known values, so the
+state at any time is found within the segments covering it; a segment
+is sealed once time moves past it by sorting its rows by key, after
+which a key's rows are found by binary search over memory mapped columns
+
+    python3 history.py 1.19.43 30
+"""
+
+# STANDARD PYTHON MODULES
+import os
+import sys
+import time
+from os.path import abspath, dirname, exists, isabs
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import HISTORY_PATH, HISTORY_SEGMENT
+from utilities import instance
+
+# every row is stamped with unix seconds and its object instance
+INDEX = {"time": "<u4", "key": "<u4"}
+
+
+class Series:
+    """
+    one append only time series of fixed width rows by object instance
+
+    :param root: the history folder
+    :param name: the series subfolder
+    :param columns: {column name: little endian numpy dtype}
+    """
+
+    def __init__(self, root, name, columns):
+        self.path = f"{root}/{name}"
+        self.columns = {**INDEX, **columns}
+        self.last = None
+
+    def segments(self, start=0, end=None):
+        """
+        :return: the segment folder names overlapping [start, end], oldest first
+        """
+        if not exists(self.path):
+            return []
+        names = sorted(os.listdir(self.path), key=int)
+        return [
+            name
+            for name in names
+            if int(name) + HISTORY_SEGMENT > start and (end is None or int(name) <= end)
+        ]
+
+    def load(self, segment):
+        """
+        memory map the columns of one segment, trimmed to the rows every
+        column finished writing
+        :return: {column: array}, sealed
+        """
+        folder = f"{self.path}/{segment}"
+        sizes = {
+            col: os.path.getsize(f"{folder}/{col}") // np.dtype(dtype).itemsize
+            for col, dtype in self.columns.items()
+        }
+        rows = min(sizes.values())
+        columns = {
+            col: np.memmap(f"{folder}/{col}", dtype=dtype, mode="r", shape=(rows,))
+            if rows
+            else np.zeros(0, dtype=dtype)
+            for col, dtype in self.columns.items()
+        }
+        return columns, exists(f"{folder}/sealed")
+
+    def latest(self):
+        """
+        the last value of every key, read from the newest segment, whose
+        keyframe holds every key that existed when it opened
+        :return: {instance: row tuple}
+        """
+        if self.last is None:
+            self.last = {}
+            names = self.segments()
+            if names:
+                columns, _ = self.load(names[-1])
+                # the last row of each key wins, sealed or not
+                keys = columns["key"][::-1]
+                _, first = np.unique(keys, return_index=True)
+                rows = len(keys) - 1 - first
+                values = [columns[col][rows] for col in self.columns if col not in INDEX]
+                self.last = {
+                    int(key): tuple(i.item() for i in row)
+                    for key, row in zip(columns["key"][rows], zip(*values))
+                }
+        return self.last
+
+    def append(self, rows, now=None):
+        """
+        add the rows that differ from the last known values; the first
+        rows of a new segment also carry a keyframe of every other key
+        :param rows: {instance: row tuple in column order}
+        :return: the number of rows written
+        """
+        now = int(time.time() if now is None else now)
+        segment = now - now % HISTORY_SEGMENT
+        last = self.latest()
+        names = self.segments()
+        fresh = not names or int(names[-1]) < segment
+        if fresh and names:
+            self.seal(names[-1])
+        changes = {k: v for k, v in rows.items() if last.get(k) != tuple(v)}
+        if fresh:
+            changes = {**last, **changes}
+        if not changes:
+            return 0
+        folder = f"{self.path}/{segment}"
+        os.makedirs(folder, exist_ok=True)
+        keys = sorted(changes)
+        data = {
+            "time": np.full(len(keys), now),
+            "key": np.array(keys),
+            **{
+                col: np.array([changes[k][idx] for k in keys])
+                for idx, col in enumerate(c for c in self.columns if c not in INDEX)
+            },
+        }
+        for col, dtype in self.columns.items():
+            with open(f"{folder}/{col}", "ab") as handle:
+                data[col].astype(dtype).tofile(handle)
+        last.update({k: tuple(v) for k, v in changes.items()})
+        return len(keys)
+
+    def seal(self, segment):
+        """
+        rewrite a finished segment sorted by key then time
+        """
+        folder = f"{self.path}/{segment}"
+        if exists(f"{folder}/sealed"):
+            return
+        columns, _ = self.load(segment)
+        order = np.lexsort((columns["time"], columns["key"]))
+        sorted_columns = {col: np.array(values[order]) for col, values in columns.items()}
+        del columns
+        for col, values in sorted_columns.items():
+            values.tofile(f"{folder}/{col}")
+        open(f"{folder}/sealed", "w", encoding="utf-8").close()
+
+    def query(self, key, start=0, end=None):
+        """
+        the rows of one key over [start, end], led by the last row before
+        start so the value at start is known
+        :param key: an object id "1.19.43" or its instance
+        :return: {column: array} sorted by time
+        """
+        key = instance(key) if isinstance(key, str) else key
+        end = time.time() if end is None else end
+        parts = []
+        for idx, segment in enumerate(self.segments(start, end)):
+            columns, sealed = self.load(segment)
+            if sealed:
+                low, high = np.searchsorted(columns["key"], [key, key + 1])
+                rows = np.arange(low, high)
+            else:
+                # appended in time order, so a key's rows are already sorted
+                rows = np.flatnonzero(columns["key"] == key)
+            times = columns["time"][rows]
+            low = np.searchsorted(times, start)
+            high = np.searchsorted(times, end, side="right")
+            # the first segment opens with a keyframe, so this row exists
+            low -= bool(idx == 0 and low)
+            parts.append({col: np.array(v[rows[low:high]]) for col, v in columns.items()})
+        return {
+            col: np.concatenate([i[col] for i in parts])
+            if parts
+            else np.zeros(0, dtype=dtype)
+            for col, dtype in self.columns.items()
+        }
+
+
+ROOT = HISTORY_PATH if isabs(HISTORY_PATH) else f"{dirname(abspath(__file__))}/{HISTORY_PATH}"
+HISTORY = {
+    "pools": Series(
+        ROOT, "pools", {"balance_a": "<i8", "balance_b": "<i8", "volume": "<i8"}
+    ),
+    "tickers": Series(ROOT, "tickers", {"price": "<f8"}),
+}
+
+
+def main():
+    """
+    print the balance history of one pool over the last few days
+    """
+    pool, days = sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    rows = HISTORY["pools"].query(pool, time.time() - days * 86400)
+    for idx in range(len(rows["time"])):
+        print(
+            time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(rows["time"][idx]))),
+            *(int(rows[col][idx]) for col in ["balance_a", "balance_b", "volume"]),
+        )
+
+
+if __name__ == "__main__":
+    main()
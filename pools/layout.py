@@ -0,0 +1,107 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Precomputed graph layout
+
+node positions are solved in numpy before the map is written, so the
+browser draws a settled graph with physics off instead of simulating it;
+positions are cached per topology and only recomputed when the set of
+nodes or edges changes
+"""
+
+# STANDARD PYTHON MODULES
+import hashlib
+from json import dumps as json_dumps
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import HEIGHT, LAYOUT_ITERATIONS
+from metrics import METRICS
+from store import read_layout, write_layout
+from utilities import dprint
+
+
+def topology(nodes, edges):
+    """
+    :return: a hash that changes only when a node or an edge is added or removed
+    """
+    pairs = sorted({tuple(sorted(edge)) for edge in edges})
+    return hashlib.sha1(json_dumps([sorted(nodes), pairs]).encode()).hexdigest()
+
+
+def spring_layout(nodes, edges, iterations=LAYOUT_ITERATIONS, seed=0):
+    """
+    vectorized Fruchterman-Reingold force directed layout
+
+    every iteration computes all pairwise repulsions as one array operation,
+    adds the edge attractions and a weak pull toward the centre so that
+    disconnected pools stay in view, then moves each node at most the
+    current temperature, which cools linearly to zero
+    :return: {node: [x, y]} in pixels, centred on the origin
+    """
+    count = len(nodes)
+    if not count:
+        return {}
+    index = {node: idx for idx, node in enumerate(nodes)}
+    src = np.array([index[a] for a, _ in edges], dtype=np.intp)
+    dst = np.array([index[b] for _, b in edges], dtype=np.intp)
+    pos = np.random.default_rng(seed).uniform(-1, 1, (count, 2))
+    # ideal edge length for nodes spread over the unit square
+    ideal = (4 / count) ** 0.5
+    temperature = 0.1
+    for step in range(iterations):
+        # float32 pairwise offsets keep each iteration in cache for ~1000 nodes
+        x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+        dx, dy = x[:, None] - x[None, :], y[:, None] - y[None, :]
+        repel = ideal**2 / np.maximum(dx * dx + dy * dy, 1e-4)
+        move = np.stack([(dx * repel).sum(axis=1), (dy * repel).sum(axis=1)], 1)
+        pull = pos[src] - pos[dst]
+        pull *= np.hypot(pull[:, 0], pull[:, 1])[:, None] / ideal
+        np.add.at(move, src, -pull)
+        np.add.at(move, dst, pull)
+        move -= pos * ideal
+        length = np.maximum(np.hypot(move[:, 0], move[:, 1]), 1e-9)
+        pos += move * (np.minimum(length, temperature) / length)[:, None]
+        temperature = 0.1 * (1 - (step + 1) / iterations)
+    pos -= pos.mean(axis=0)
+    pos *= HEIGHT / 2 / max(np.abs(pos).max(), 1e-9)
+    return {node: [round(x), round(y)] for node, (x, y) in zip(nodes, pos.tolist())}
+
+
+def cached_layout(nodes, edges):
+    """
+    spring_layout, reused from the cache while the topology is unchanged
+    :return: {node: [x, y]}
+    """
+    key = topology(nodes, edges)
+    positions = read_layout(key)
+    hit = positions is not None and set(positions) == set(nodes)
+    METRICS.cache("layouts", hit, not hit)
+    if not hit:
+        positions = spring_layout(nodes, edges)
+        write_layout(key, positions)
+        dprint(f"\ncomputed layout {key} for {len(nodes)} nodes")
+    return positions
+
+
+def export_graph(net, path):
+    """
+    write the pyvis nodes and edges, with their fixed coordinates,
+    as compact json for any other renderer
+    """
+    keys = ["id", "label", "x", "y", "color", "size", "title"]
+    graph = {
+        "nodes": [{k: node[k] for k in keys if k in node} for node in net.nodes],
+        "edges": [
+            {k: edge[k] for k in ["from", "to", "value", "title"] if k in edge}
+            for edge in net.edges
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(json_dumps(graph, separators=(",", ":")))
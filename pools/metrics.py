@@ -0,0 +1,179 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Run instrumentation
+
+one process wide METRICS registry counts every rpc call by method and
+node with a latency histogram and payload sizes, cache hits and misses,
+and the wall time of each stage; at the end of a run it is written as
+a json report and a prometheus textfile, and with PROFILE set each
+stage that runs alone also leaves a cProfile dump
+"""
+
+# STANDARD PYTHON MODULES
+import cProfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from json import dumps as json_dumps
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import PROFILE
+from utilities import PATH
+
+# upper bounds in seconds of the rpc latency histogram buckets
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    counters, histograms and timers for one run of the mapper
+    """
+
+    def __init__(self):
+        self.rpc = {}
+        self.caches = {}
+        self.stages = {}
+        self.reset()
+
+    def reset(self):
+        """
+        forget everything recorded so far
+        """
+        self.rpc = defaultdict(
+            lambda: {
+                "count": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "bytes_sent": 0,
+                "bytes_received": 0,
+                "buckets": [0] * len(BUCKETS),
+            }
+        )
+        self.caches = defaultdict(lambda: {"hit": 0, "miss": 0})
+        self.stages = {}
+
+    def record_rpc(self, method, node, seconds, sent, received, error=False):
+        """
+        one rpc round trip
+        """
+        entry = self.rpc[(method, node)]
+        entry["count"] += 1
+        entry["errors"] += bool(error)
+        entry["seconds"] += seconds
+        entry["bytes_sent"] += sent
+        entry["bytes_received"] += received
+        for idx, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry["buckets"][idx] += 1
+                break
+
+    def cache(self, name, hits=0, misses=0):
+        """
+        count lookups answered by a cache, and those it had to fetch
+        """
+        self.caches[name]["hit"] += hits
+        self.caches[name]["miss"] += misses
+
+    @contextmanager
+    def stage(self, name, profile=PROFILE):
+        """
+        time a block as a named stage; stages that overlap others on the
+        event loop must pass profile=False, only one profiler can run
+        """
+        profiler = cProfile.Profile() if profile else None
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(f"{PATH}/profile_{name}.prof")
+
+    def report(self):
+        """
+        :return: everything recorded as a json friendly dict
+        """
+        methods = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        for (method, _), entry in self.rpc.items():
+            methods[method]["count"] += entry["count"]
+            methods[method]["seconds"] += entry["seconds"]
+        return {
+            "stages": {key: round(value, 4) for key, value in self.stages.items()},
+            "rpc": {
+                "calls": sum(i["count"] for i in self.rpc.values()),
+                "errors": sum(i["errors"] for i in self.rpc.values()),
+                "bytes_sent": sum(i["bytes_sent"] for i in self.rpc.values()),
+                "bytes_received": sum(i["bytes_received"] for i in self.rpc.values()),
+                "by_method": dict(methods),
+                "by_method_and_node": [
+                    {"method": method, "node": node, **entry}
+                    for (method, node), entry in self.rpc.items()
+                ],
+                "buckets": list(BUCKETS),
+            },
+            "caches": {
+                name: {
+                    **entry,
+                    "ratio": round(entry["hit"] / (entry["hit"] + entry["miss"]), 4)
+                    if entry["hit"] + entry["miss"]
+                    else None,
+                }
+                for name, entry in self.caches.items()
+            },
+        }
+
+    def prometheus(self):
+        """
+        :return: the registry in the prometheus text exposition format
+        """
+        lines = [
+            "# TYPE pool_mapper_rpc_seconds histogram",
+            "# TYPE pool_mapper_rpc_errors_total counter",
+            "# TYPE pool_mapper_rpc_bytes_total counter",
+        ]
+        for (method, node), entry in self.rpc.items():
+            labels = f'method="{method}",node="{node}"'
+            running = 0
+            for bound, count in zip(BUCKETS, entry["buckets"]):
+                running += count
+                lines.append(f'pool_mapper_rpc_seconds_bucket{{{labels},le="{bound}"}} {running}')
+            lines.append(f'pool_mapper_rpc_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f"pool_mapper_rpc_seconds_sum{{{labels}}} {entry['seconds']}")
+            lines.append(f"pool_mapper_rpc_seconds_count{{{labels}}} {entry['count']}")
+            lines.append(f"pool_mapper_rpc_errors_total{{{labels}}} {entry['errors']}")
+            for way in ("sent", "received"):
+                lines.append(
+                    f'pool_mapper_rpc_bytes_total{{{labels},direction="{way}"}} '
+                    f"{entry['bytes_' + way]}"
+                )
+        lines.append("# TYPE pool_mapper_cache_lookups_total counter")
+        for name, entry in self.caches.items():
+            for result in ("hit", "miss"):
+                lines.append(
+                    f'pool_mapper_cache_lookups_total{{cache="{name}",result="{result}"}} '
+                    f"{entry[result]}"
+                )
+        lines.append("# TYPE pool_mapper_stage_seconds gauge")
+        for name, seconds in self.stages.items():
+            lines.append(f'pool_mapper_stage_seconds{{stage="{name}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=PATH):
+        """
+        save run_report.json and metrics.prom in path
+        """
+        with open(f"{path}/run_report.json", "w", encoding="utf-8") as handle:
+            handle.write(json_dumps(self.report(), indent=1))
+        with open(f"{path}/metrics.prom", "w", encoding="utf-8") as handle:
+            handle.write(self.prometheus())
+
+
+METRICS = Metrics()
@@ -0,0 +1,463 @@
+# pylint: disable=broad-except
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Mock BitShares node
+
+a local websocket server answering the database api calls the mapper
+makes from a fixture of chain objects, with configurable latency,
+a batch size limit, and injected errors and dropped connections;
+every request, method and byte is counted
+
+in notice mode the subscriptions of each connection are pushed notices
+like a node's: drifting balances of the subscribed pools, beside other
+objects the client has seen, and partial fills and removals of orders
+in one of the subscribed markets, both as objects and as fill operations
+
+    python3 mock_node.py 8090 --fixture chain.json
+"""
+
+# STANDARD PYTHON MODULES
+import argparse
+import asyncio
+import random
+from collections import Counter
+from json import dumps as json_dumps
+from json import load as json_load
+from json import loads as json_loads
+
+# THIRD PARTY MODULES
+import websockets
+
+# operation id of an order fill, as notified to market subscriptions
+FILL_ORDER = 4
+
+
+def synthetic_chain(pools=300, assets=120, seed=0, orders=4, accounts=200):
+    """
+    a connected fixture of assets, pools, share supplies, limit orders on
+    the pool pairs, accounts and the USD and BTC feeds; every asset has a
+    hidden BTS value and pools and orders trade near it
+    :return: {object_id: object}
+    """
+    rng = random.Random(seed)
+    objects, values = {}, {}
+    for idx in range(assets):
+        precision = 5 if idx == 0 else rng.randint(0, 8)
+        values[f"1.3.{idx}"] = 1.0 if idx == 0 else 10 ** rng.uniform(-3, 3)
+        objects[f"1.3.{idx}"] = {
+            "id": f"1.3.{idx}",
+            "symbol": "BTS" if idx == 0 else f"ASSET{idx}",
+            "precision": precision,
+            "issuer": f"1.2.{idx % accounts}",
+        }
+    for idx in range(pools):
+        share = f"1.3.{assets + idx}"
+        if idx < assets - 1:
+            # the first pools span a tree from BTS so every asset is reachable
+            asset_a, asset_b = f"1.3.{rng.randrange(idx + 1)}", f"1.3.{idx + 1}"
+        else:
+            asset_a, asset_b = (f"1.3.{i}" for i in rng.sample(range(assets), 2))
+        depth = 10 ** rng.uniform(2, 7)
+        balances = [
+            int(depth / values[asset] * 10 ** objects[asset]["precision"])
+            for asset in (asset_a, asset_b)
+        ]
+        objects[share] = {"id": share, "symbol": f"POOL{idx}", "precision": 5}
+        objects[share.replace("1.3.", "2.3.", 1)] = {
+            "id": share.replace("1.3.", "2.3.", 1),
+            "current_supply": str(rng.randint(1, 10**12)),
+        }
+        objects[f"1.19.{idx}"] = {
+            "id": f"1.19.{idx}",
+            "asset_a": asset_a,
+            "asset_b": asset_b,
+            "balance_a": str(balances[0]),
+            "balance_b": str(balances[1]),
+            "share_asset": share,
+            "taker_fee_percent": 30,
+            "statistics": {
+                "_24h_exchange_a2b_amount_a": str(rng.randint(0, balances[0])),
+                "_24h_exchange_b2a_amount_a": str(rng.randint(0, balances[0])),
+            },
+        }
+    for idx in range(pools * orders):
+        pool = objects[f"1.19.{idx // orders}"]
+        # alternate sides, each a little away from the pool price
+        sell, buy = (
+            (pool["asset_a"], pool["asset_b"])
+            if idx % 2
+            else (pool["asset_b"], pool["asset_a"])
+        )
+        amount = max(
+            int(
+                int(pool["balance_a" if sell == pool["asset_a"] else "balance_b"])
+                * rng.uniform(0.001, 0.05)
+            ),
+            1,
+        )
+        receive = (
+            amount
+            / 10 ** objects[sell]["precision"]
+            * values[sell]
+            / values[buy]
+            * rng.uniform(1.001, 1.2)
+            * 10 ** objects[buy]["precision"]
+        )
+        objects[f"1.7.{idx}"] = {
+            "id": f"1.7.{idx}",
+            "for_sale": amount,
+            "sell_price": {
+                "base": {"amount": amount, "asset_id": sell},
+                "quote": {"amount": max(int(receive), 1), "asset_id": buy},
+            },
+        }
+    for idx in range(accounts):
+        objects[f"1.2.{idx}"] = {"id": f"1.2.{idx}", "name": f"account{idx}"}
+    # the first few assets are pegged to BTS, 2.4.294 and 2.4.295 the reference feeds
+    for idx in range(1, min(6, assets)):
+        asset, bitasset = f"1.3.{idx}", f"2.4.{293 + idx}"
+        objects[asset]["bitasset_data_id"] = bitasset
+        objects[bitasset] = {
+            "id": bitasset,
+            "asset_id": asset,
+            "options": {"short_backing_asset": "1.3.0"},
+            "median_feed": {
+                "settlement_price": {
+                    "base": {
+                        "amount": 10 ** objects[asset]["precision"],
+                        "asset_id": asset,
+                    },
+                    "quote": {
+                        "amount": int(values[asset] * rng.uniform(0.97, 1.03) * 10**5),
+                        "asset_id": "1.3.0",
+                    },
+                }
+            },
+        }
+    return objects
+
+
+class MockNode:
+    """
+    answer get_objects, get_liquidity_pools, get_ticker, get_limit_orders,
+    get_block and the probe call from a fixture, counting every request
+    and byte
+
+    :param latency: seconds added before each response
+    :param max_batch: refuse get_objects style calls with more ids than this
+    :param error_rate: chance of answering any request with an rpc error
+    :param drop_rate: chance of closing the connection instead of answering
+    :param notice_interval: seconds between the notices pushed to each
+        subscribed connection, None sends none
+    """
+
+    def __init__(
+        self,
+        objects,
+        latency=0.0,
+        max_batch=1000,
+        error_rate=0.0,
+        drop_rate=0.0,
+        seed=0,
+        notice_interval=None,
+    ):
+        self.objects = objects
+        self.latency = latency
+        self.max_batch = max_batch
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.notice_interval = notice_interval
+        # connection: {"objects": (callback, ids fetched), "markets": [...]}
+        self.subscriptions = {}
+        self.markets = None
+        self.notices = Counter()
+        self.calls = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.server = None
+        self.port = None
+
+    @property
+    def url(self):
+        """
+        the ws:// url to add to NODES
+        """
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def start(self, port=0):
+        """
+        listen on localhost, an unused port by default
+        """
+        self.server = await websockets.serve(
+            self.handle, "127.0.0.1", port, max_size=None
+        )
+        self.port = next(iter(self.server.sockets)).getsockname()[1]
+        return self
+
+    async def close(self):
+        """
+        stop listening and drop every connection
+        """
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, wss, *_):
+        """
+        answer each request on its own task so responses pipeline like a node
+        """
+        tasks = set()
+        notifier = None
+        if self.notice_interval is not None:
+            notifier = asyncio.create_task(self.notify(wss))
+        try:
+            async for message in wss:
+                self.bytes_in += len(message)
+                task = asyncio.create_task(self.respond(wss, json_loads(message)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if notifier is not None:
+                notifier.cancel()
+            self.subscriptions.pop(wss, None)
+
+    async def respond(self, wss, request):
+        """
+        one response after the configured latency
+        """
+        await asyncio.sleep(self.latency)
+        _, method, params = request["params"]
+        self.calls[method] += 1
+        if self.rng.random() < self.drop_rate:
+            await wss.close()
+            return
+        ret = {"id": request["id"], "jsonrpc": "2.0"}
+        try:
+            if self.rng.random() < self.error_rate:
+                raise ValueError("injected failure")
+            ret["result"] = self.call(method, params)
+            if self.notice_interval is not None:
+                self.subscribe(wss, method, params)
+        except Exception as error:
+            ret["error"] = {"code": 1, "message": str(error)}
+        message = json_dumps(ret)
+        self.bytes_out += len(message)
+        try:
+            await wss.send(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    def call(self, method, params):
+        """
+        the database api result for one call
+        """
+        if method in ("get_objects", "get_liquidity_pools"):
+            if len(params[0]) > self.max_batch:
+                raise ValueError(f"{len(params[0])} objects exceeds {self.max_batch}")
+            return [self.objects.get(i) for i in params[0]]
+        if method == "get_ticker":
+            base, quote = params[:2]
+            # like a node, an asset that never traded has a latest price of 0
+            value = self.value(base)
+            return {"latest": str(self.value(quote) / value if value else 0)}
+        if method == "get_dynamic_global_properties":
+            return {"head_block_number": 1000, "last_irreversible_block_num": 990}
+        if method == "get_block":
+            return self.block(params[0])
+        if method == "get_limit_orders":
+            pair = set(params[:2])
+            return [
+                order
+                for key, order in self.objects.items()
+                if key.startswith("1.7.")
+                and {order["sell_price"][i]["asset_id"] for i in ("base", "quote")}
+                == pair
+            ][: params[2]]
+        if method in ("set_subscribe_callback", "subscribe_to_market"):
+            return None
+        raise ValueError(f"{method} is not mocked")
+
+    def subscribe(self, wss, method, params):
+        """
+        remember what one connection subscribed to, for the notice mode
+        """
+        subs = self.subscriptions.setdefault(wss, {"objects": None, "markets": []})
+        if method == "set_subscribe_callback":
+            subs["objects"] = (params[0], set())
+        elif method == "subscribe_to_market":
+            subs["markets"].append((params[0], frozenset(params[1:3])))
+        elif method == "get_objects" and subs["objects"] is not None:
+            # like a node, objects fetched after the callback is set are watched
+            subs["objects"][1].update(params[0])
+
+    async def notify(self, wss):
+        """
+        push a pool and a market notice to a connection every notice_interval
+        """
+        while True:
+            await asyncio.sleep(self.notice_interval)
+            subs = self.subscriptions.get(wss, {"objects": None, "markets": []})
+            notices = []
+            if subs["objects"] is not None:
+                callback, watched = subs["objects"]
+                pools = sorted(i for i in watched if i.startswith("1.19."))
+                if pools:
+                    pool = self.drift(self.rng.choice(pools))
+                    # a node also notifies other watched objects in the same block
+                    notices.append(
+                        [callback, [[pool, {"id": "2.1.0", "head_block_number": 1000}]]]
+                    )
+            if subs["markets"]:
+                callback, pair = self.rng.choice(subs["markets"])
+                updates = self.trade(pair)
+                if updates:
+                    notices.append([callback, [updates]])
+            for params in notices:
+                self.notices[params[0]] += 1
+                try:
+                    await wss.send(json_dumps({"method": "notice", "params": params}))
+                except websockets.ConnectionClosed:
+                    return
+
+    def drift(self, pool_id):
+        """
+        move the balances of one pool a little
+        :return: the changed pool object
+        """
+        pool = dict(self.objects[pool_id])
+        for key in ("balance_a", "balance_b"):
+            pool[key] = str(max(int(int(pool[key]) * self.rng.uniform(0.98, 1.02)), 1))
+        self.objects[pool_id] = pool
+        return pool
+
+    def trade(self, pair):
+        """
+        fill half of one order in a market, or all of it, like a block would
+        :return: the market notice updates, the changed order object or the
+            removed order id followed by the [operation, result] of the fill
+        """
+        if self.markets is None:
+            self.markets = {}
+            for key, order in self.objects.items():
+                if key.startswith("1.7."):
+                    market = frozenset(
+                        order["sell_price"][i]["asset_id"] for i in ("base", "quote")
+                    )
+                    self.markets.setdefault(market, []).append(key)
+        orders = [i for i in self.markets.get(pair, []) if i in self.objects]
+        if not orders:
+            return []
+        order = dict(self.objects[self.rng.choice(orders)])
+        paid = max(int(order["for_sale"]) // 2, 1)
+        fill = [
+            [
+                FILL_ORDER,
+                {
+                    "order_id": order["id"],
+                    "pays": {
+                        "amount": paid,
+                        "asset_id": order["sell_price"]["base"]["asset_id"],
+                    },
+                },
+            ],
+            [0, {}],
+        ]
+        if int(order["for_sale"]) - paid > 0 and self.rng.random() < 0.5:
+            order["for_sale"] = int(order["for_sale"]) - paid
+            self.objects[order["id"]] = order
+            return [order, fill]
+        del self.objects[order["id"]]
+        return [order["id"], fill]
+
+    def block(self, num):
+        """
+        a block of up to five transfers between the fixture accounts,
+        the same every time it is asked for
+        """
+        rng = random.Random(num)
+        accounts = [k for k in self.objects if k.startswith("1.2.")]
+        assets = [k for k in self.objects if k.startswith("1.3.")][:10]
+        return {
+            "transactions": [
+                {
+                    "operations": [
+                        [
+                            0,
+                            {
+                                "from": rng.choice(accounts),
+                                "to": rng.choice(accounts),
+                                "amount": {
+                                    "amount": rng.randint(1, 10**8),
+                                    "asset_id": rng.choice(assets),
+                                },
+                            },
+                        ]
+                    ]
+                }
+                for _ in range(rng.randint(0, 5))
+            ]
+        }
+
+    def value(self, asset_id):
+        """
+        the BTS value of one unit of an asset, read from its deepest pool with BTS
+        """
+        if asset_id == "1.3.0":
+            return 1.0
+        best, value = 0, 0.0
+        for pool in self.objects.values():
+            if pool["id"].startswith("1.19.") and "1.3.0" in (
+                pool["asset_a"],
+                pool["asset_b"],
+            ) and asset_id in (pool["asset_a"], pool["asset_b"]):
+                bts, other = (
+                    ("balance_a", "balance_b")
+                    if pool["asset_a"] == "1.3.0"
+                    else ("balance_b", "balance_a")
+                )
+                if int(pool[bts]) > best:
+                    precision = self.objects[asset_id]["precision"]
+                    best = int(pool[bts])
+                    value = (best / 10**5) / (int(pool[other]) / 10**precision)
+        return value
+
+
+def load_fixture(path):
+    """
+    a {object_id: object} fixture saved as json
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        return json_load(handle)
+
+
+async def serve(port, fixture=None):
+    """
+    run a mock node until interrupted
+    :param fixture: path of a json fixture to answer from, else a synthetic chain
+    """
+    chain = load_fixture(fixture) if fixture else synthetic_chain()
+    node = await MockNode(chain).start(port)
+    print(f"mock node listening on {node.url}")
+    await asyncio.Future()
+
+
+def main():
+    """
+    parse the port and fixture, then serve
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[3])
+    parser.add_argument("port", type=int, nargs="?", default=8090)
+    parser.add_argument("--fixture")
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.fixture))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# pylint: disable=broad-except
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+"""
+
+# STANDARD PYTHON MODULES
+import asyncio
+import contextlib
+import time
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import NODES, PROBE_TIMEOUT, RETRIES, RPC_TIMEOUT, WARM_NODES
+from rpc import AsyncRPC, RPCError, refused
+from utilities import dprint
+
+# seconds between bitshares blocks, used to price a lagging head block
+BLOCK_INTERVAL = 3
+
+
+async def probe_node(node):
+    """
+    connect to a node and time a get_dynamic_global_properties round trip
+    :return: (latency, head block number, open AsyncRPC) or None if unreachable
+    """
+    rpc = AsyncRPC(node)
+    try:
+        await asyncio.wait_for(rpc.connect(timeout=PROBE_TIMEOUT), PROBE_TIMEOUT)
+        start = time.time()
+        props = await asyncio.wait_for(
+            rpc.query(["database", "get_dynamic_global_properties", []]),
+            PROBE_TIMEOUT,
+        )
+        latency = time.time() - start
+    except Exception:
+        with contextlib.suppress(Exception):
+            await rpc.close()
+        return None
+    return latency, int(props["head_block_number"]), rpc
+
+
+class NodePool:
+    """
+    Latency ranked pool of warm AsyncRPC connections
+
+    every node is probed in parallel and scored by round trip latency
+    plus a penalty for each block its head lags the freshest node;
+    calls go to the least loaded warm node, so a gather of many calls
+    is split across several nodes at once, and a failed call is retried
+    on the next best node while a dead one is replaced by a spare
+    """
+
+    def __init__(self, nodes=None, warm=WARM_NODES):
+        self.nodes = list(nodes or NODES)
+        self.warm = warm
+        self.ranked = []
+        self.live = {}
+        self.dead = set()
+        self.lock = asyncio.Lock()
+
+    async def connect(self):
+        """
+        probe every node in parallel, keep the best few connections warm
+        """
+        probes = await asyncio.gather(*(probe_node(node) for node in self.nodes))
+        probes = {node: ret for node, ret in zip(self.nodes, probes) if ret}
+        if not probes:
+            raise ConnectionError("no node in NODES answered the probe")
+        head = max(block for _, block, _ in probes.values())
+        scores = {
+            node: latency + BLOCK_INTERVAL * (head - block)
+            for node, (latency, block, _) in probes.items()
+        }
+        self.ranked = sorted(scores, key=scores.get)
+        self.dead = set()
+        self.live = {node: probes[node][2] for node in self.ranked[: self.warm]}
+        await asyncio.gather(
+            *(probes[node][2].close() for node in self.ranked[self.warm :]),
+            return_exceptions=True,
+        )
+        dprint("\nnode ranking", {node: round(scores[node], 3) for node in self.ranked})
+        return self
+
+    async def close(self):
+        """
+        close every warm connection
+        """
+        await asyncio.gather(
+            *(rpc.close() for rpc in self.live.values()), return_exceptions=True
+        )
+        self.live = {}
+
+    async def promote(self):
+        """
+        top up the warm connections from the best ranked spares
+        """
+        async with self.lock:
+            for node in self.ranked:
+                if len(self.live) >= self.warm:
+                    break
+                if node in self.live or node in self.dead:
+                    continue
+                try:
+                    self.live[node] = await AsyncRPC(node).connect(
+                        timeout=PROBE_TIMEOUT
+                    )
+                except Exception:
+                    self.dead.add(node)
+            if not self.live:
+                # every ranked node has failed, start over with a fresh probe;
+                # finding none is only fatal when a call next needs a node
+                with contextlib.suppress(ConnectionError):
+                    await self.connect()
+
+    async def drop(self, node):
+        """
+        retire a failed node and promote a spare in its place
+        """
+        rpc = self.live.pop(node, None)
+        if rpc is None:
+            return
+        self.dead.add(node)
+        with contextlib.suppress(Exception):
+            await rpc.close()
+        await self.promote()
+
+    async def pick(self):
+        """
+        the warm node with the fewest requests in flight
+        """
+        if not self.live:
+            await self.promote()
+        if not self.live:
+            raise ConnectionError("no node in NODES is left to answer")
+        return min(self.live, key=lambda node: len(self.live[node].pending))
+
+    async def query(self, params, node=None, sized=False):
+        """
+        AsyncRPC.query with failover to another node
+        :param node: the node to try first, if it is still warm
+        :param sized: also return the bytes of the response, as AsyncRPC.query
+        """
+        failure = None
+        for _ in range(RETRIES):
+            if node not in self.live:
+                node = await self.pick()
+            try:
+                return await asyncio.wait_for(
+                    self.live[node].query(params, sized=sized), RPC_TIMEOUT
+                )
+            except RPCError as error:
+                # a batch too large for this node is for the batcher to shrink
+                if refused(error):
+                    raise
+                # the node answered, but its error may be its own; it stays warm
+                failure = error
+                node = next((i for i in self.live if i != node), None)
+            except Exception as error:
+                print(f"{node} failed with {error!r}, retrying on another node...")
+                failure = None
+                await self.drop(node)
+                node = None
+        if failure is not None:
+            raise failure
+        raise ConnectionError(f"{params[1]} failed on {RETRIES} nodes")
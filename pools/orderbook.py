@@ -0,0 +1,344 @@
+# pylint: disable=broad-except
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Orderbook visualizer
+
+keeps a local order book for the market of every pair in the pool
+graph; each market is subscribed before its book is fetched once, after
+which the node pushes every new or changed order object and the ids of
+removed orders, and the books are patched from those diffs; the order
+creations and fills of each block are notified too, but the objects
+already carry their outcome, so applying those as well would count
+every fill twice;
+depth charts of each book, alone and with the constant product depth of
+its pools added, are rendered to orderbooks.html and orderbooks.json
+every BOOK_RENDER seconds
+
+    python3 orderbook.py
+"""
+
+# STANDARD PYTHON MODULES
+import asyncio
+import sys
+from json import dumps as json_dumps
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import (
+    BOOK_DEPTH,
+    BOOK_RENDER,
+    DARK_THEME,
+    DEPTH_LEVELS,
+    DEPTH_RANGE,
+    INFLIGHT,
+    RPC_TIMEOUT,
+)
+from nodes import NodePool
+from pool_mapper import collect, init_pipe
+from rpc import RPCError, anotices
+from utilities import NIL, dprint
+
+
+def order_side(order, asset_a, asset_b, name_cache):
+    """
+    price a limit order like the pools price asset_b, in asset_a per asset_b
+    :return: (is_ask, price, size in asset_b)
+    """
+    base, quote = order["sell_price"]["base"], order["sell_price"]["quote"]
+    scale_a = 10 ** name_cache[asset_a]["precision"]
+    scale_b = 10 ** name_cache[asset_b]["precision"]
+    if base["asset_id"] == asset_b:
+        # selling asset_b for asset_a
+        price = (int(quote["amount"]) / scale_a) / (int(base["amount"]) / scale_b)
+        return True, price, int(order["for_sale"]) / scale_b
+    # buying asset_b with asset_a
+    price = (int(base["amount"]) / scale_a) / (int(quote["amount"]) / scale_b)
+    return False, price, int(order["for_sale"]) / scale_a / price
+
+
+def pool_depth(balance_a, balance_b, prices):
+    """
+    the asset_b a constant product pool trades to move its price to each
+    level; bids below the pool price, asks above it, fees not included
+    :return: (bid depth, ask depth) arrays aligned with prices
+    """
+    held = np.sqrt(balance_a * balance_b / prices)
+    return np.maximum(held - balance_b, 0), np.maximum(balance_b - held, 0)
+
+
+class OrderBook:
+    """
+    open limit order objects of one pair, keyed by order id
+    """
+
+    def __init__(self, asset_a, asset_b, name_cache):
+        self.asset_a = asset_a
+        self.asset_b = asset_b
+        self.name_cache = name_cache
+        self.orders = {}
+
+    def sides(self):
+        """
+        :return: (bid prices, bid sizes), (ask prices, ask sizes),
+            each as numpy arrays sorted from the best price outward
+        """
+        rows = np.array(
+            [
+                order_side(i, self.asset_a, self.asset_b, self.name_cache)
+                for i in self.orders.values()
+            ],
+            dtype=float,
+        ).reshape(-1, 3)
+        ret = []
+        for is_ask in (0, 1):
+            side = rows[rows[:, 0] == is_ask]
+            side = side[np.argsort(side[:, 1] if is_ask else -side[:, 1])]
+            ret.append((side[:, 1], side[:, 2]))
+        return ret
+
+    def depth(self, prices):
+        """
+        cumulative bid size at or above and ask size at or below each level
+        :return: (bid depth, ask depth) arrays aligned with prices
+        """
+        (bid_prices, bid_sizes), (ask_prices, ask_sizes) = self.sides()
+        bid_cumulative = np.concatenate([[0], np.cumsum(bid_sizes)])
+        ask_cumulative = np.concatenate([[0], np.cumsum(ask_sizes)])
+        # bids are sorted by descending price, search them negated
+        bids = bid_cumulative[np.searchsorted(-bid_prices, -prices, side="right")]
+        asks = ask_cumulative[np.searchsorted(ask_prices, prices, side="right")]
+        return bids, asks
+
+
+class OrderBooks:
+    """
+    one OrderBook per pair in the pool graph, patched from limit order diffs
+    """
+
+    def __init__(self, weights, name_cache):
+        self.name_cache = name_cache
+        self.books = {}
+        self.pools = {}
+        self.owner = {}
+        for weight in weights:
+            pair = (weight["asset_a"], weight["asset_b"])
+            self.books.setdefault(pair, OrderBook(*pair, name_cache))
+            self.pools.setdefault(pair, []).append(weight)
+
+    def apply(self, order):
+        """
+        add or update one limit order object, ignoring other markets
+        """
+        sell = order["sell_price"]
+        pair = (sell["base"]["asset_id"], sell["quote"]["asset_id"])
+        pair = pair if pair in self.books else pair[::-1]
+        if pair not in self.books:
+            return
+        self.owner[order["id"]] = pair
+        self.books[pair].orders[order["id"]] = order
+
+    def remove(self, order_id):
+        """
+        forget one filled, cancelled or expired order
+        """
+        pair = self.owner.pop(order_id, None)
+        if pair is not None:
+            self.books[pair].orders.pop(order_id, None)
+
+    def ingest(self, item):
+        """
+        apply one update of a market notice; removed orders come by id
+        alone, and the [operation, result] pairs of a block are skipped
+        """
+        if isinstance(item, str) and item.startswith("1.7."):
+            self.remove(item)
+        elif isinstance(item, dict) and str(item.get("id")).startswith("1.7."):
+            self.apply(item)
+
+    async def load(self, rpc):
+        """
+        subscribe to every market on one AsyncRPC connection, then fetch
+        each book once; the notices queued meanwhile are left for follow,
+        replaying them over the fetched books leaves each order as last notified
+        """
+
+        async def market(callback, pair):
+            await rpc.query(["database", "subscribe_to_market", [callback, *pair]])
+            for order_id in list(self.books[pair].orders):
+                self.remove(order_id)
+            for order in await rpc.query(
+                ["database", "get_limit_orders", [*pair, BOOK_DEPTH]]
+            ):
+                self.apply(order)
+
+        # each market holds one request in flight at a time, so the timeout
+        # runs from its first request rather than from the back of the queue
+        gate = asyncio.Semaphore(INFLIGHT)
+
+        async def timed_market(callback, pair):
+            # a stalled node fails the load instead of hanging it
+            async with gate:
+                try:
+                    await asyncio.wait_for(market(callback, pair), RPC_TIMEOUT)
+                except asyncio.TimeoutError as error:
+                    raise ConnectionError(f"{rpc.node} stalled on {pair}") from error
+
+        await asyncio.gather(
+            *(timed_market(idx, pair) for idx, pair in enumerate(self.books))
+        )
+        print(f"loaded {len(self.owner)} orders in {len(self.books)} markets")
+
+    async def follow(self, rpc):
+        """
+        patch the books from the notices of a loaded connection until it closes
+        """
+        async for item in anotices(rpc, everything=True):
+            self.ingest(item)
+
+    def depth(self, pair):
+        """
+        book and pool depth at DEPTH_LEVELS prices either side of the mid
+        :return: {"prices", "book_bids", "book_asks", "pool_bids", "pool_asks"}
+        """
+        pools = self.pools[pair]
+        deepest = max(pools, key=lambda i: i["balance_b"])
+        mid = deepest["balance_a"] / (deepest["balance_b"] + NIL)
+        (bid_prices, _), (ask_prices, _) = self.books[pair].sides()
+        if not mid and len(bid_prices) and len(ask_prices):
+            mid = (bid_prices[0] + ask_prices[0]) / 2
+        mid = mid or 1
+        prices = mid * np.geomspace(
+            1 - DEPTH_RANGE, 1 / (1 - DEPTH_RANGE), 2 * DEPTH_LEVELS + 1
+        )
+        book_bids, book_asks = self.books[pair].depth(prices)
+        pool_bids, pool_asks = np.zeros_like(prices), np.zeros_like(prices)
+        for pool in pools:
+            if pool["balance_a"] and pool["balance_b"]:
+                bids, asks = pool_depth(pool["balance_a"], pool["balance_b"], prices)
+                pool_bids += bids
+                pool_asks += asks
+        return {
+            "prices": prices,
+            "book_bids": book_bids,
+            "book_asks": book_asks,
+            "pool_bids": pool_bids,
+            "pool_asks": pool_asks,
+        }
+
+    def export(self, path="orderbooks"):
+        """
+        write the depth of every market as json, and as svg charts in html,
+        deepest combined market first
+        """
+        markets = []
+        for pair in self.books:
+            depth = {k: v.tolist() for k, v in self.depth(pair).items()}
+            markets.append(
+                {
+                    "pair": [self.name_cache[i]["symbol"] for i in pair],
+                    "ids": list(pair),
+                    "pools": [i["pool_id"] for i in self.pools[pair]],
+                    "orders": len(self.books[pair].orders),
+                    **depth,
+                }
+            )
+        markets.sort(
+            key=lambda i: -(
+                i["book_bids"][0] + i["pool_bids"][0] + i["book_asks"][-1] + i["pool_asks"][-1]
+            )
+        )
+        with open(f"{path}.json", "w", encoding="utf-8") as handle:
+            handle.write(json_dumps(markets, separators=(",", ":")))
+        background = "#222222" if DARK_THEME else "#888888"
+        font = "#888888" if DARK_THEME else "#222222"
+        with open(f"{path}.html", "w", encoding="utf-8") as handle:
+            handle.write(
+                f'<html><body style="background:{background};color:{font};'
+                f'font-family:monospace">'
+                + "".join(depth_chart(i) for i in markets)
+                + "</body></html>"
+            )
+
+
+def depth_chart(market, width=600, height=200):
+    """
+    one market as an inline svg; dashed lines are the book alone, solid
+    lines the book plus its pools, bids green and asks red
+    """
+    prices = np.log(market["prices"])
+    x_scale = (prices - prices[0]) / (prices[-1] - prices[0] + NIL) * width
+    top = max(
+        market["book_bids"][0] + market["pool_bids"][0],
+        market["book_asks"][-1] + market["pool_asks"][-1],
+        NIL,
+    )
+
+    def line(values, color, dashed):
+        y_scale = height - np.asarray(values) / top * height
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(x_scale, y_scale))
+        dash = ' stroke-dasharray="4"' if dashed else ""
+        return f'<polyline fill="none" stroke="{color}"{dash} points="{points}"/>'
+
+    combined = {
+        side: np.add(market[f"book_{side}"], market[f"pool_{side}"])
+        for side in ("bids", "asks")
+    }
+    return (
+        f"<h3>{market['pair'][0]} per {market['pair'][1]} "
+        f"{market['orders']} orders, pools {' '.join(market['pools'])}</h3>"
+        f'<svg width="{width}" height="{height}">'
+        + line(market["book_bids"], "#93c47d", True)
+        + line(market["book_asks"], "#e06666", True)
+        + line(combined["bids"], "#93c47d", False)
+        + line(combined["asks"], "#e06666", False)
+        + "</svg>"
+    )
+
+
+async def run(once=False):
+    """
+    collect the pool graph, load and render every book, then keep them
+    current from notices, rendering every BOOK_RENDER seconds
+    """
+    init_pipe()
+    rpc = await NodePool().connect()
+    try:
+        weights, name_cache, _, _ = await collect(rpc)
+        books = OrderBooks(weights, name_cache)
+        while True:
+            node = await rpc.pick()
+            try:
+                await books.load(rpc.live[node])
+                books.export()
+                if once:
+                    return
+                following = asyncio.ensure_future(books.follow(rpc.live[node]))
+                while not following.done():
+                    await asyncio.wait([following], timeout=BOOK_RENDER)
+                    books.export()
+                    dprint(f"\nrendered {len(books.owner)} orders")
+                following.result()
+            except (ConnectionError, RPCError) as error:
+                # every book is fetched again, orders removed meanwhile are dropped
+                print(f"{node} subscription lost with {error!r}, resubscribing...")
+                await rpc.drop(node)
+    finally:
+        await rpc.close()
+
+
+def main():
+    """
+    render the books once with --once, else follow them until interrupted
+    """
+    asyncio.run(run("--once" in sys.argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,12 @@ MIT License
 """
 
 # STANDARD MODULES
+import asyncio
 import json
-import math
+import time
+import webbrowser
 from os import system
-from os.path import exists
+from os.path import abspath, exists
 from shutil import rmtree
 
 # THIRD PARTY MODULES
@@ -23,254 +25,339 @@ from pyvis.network import Network
 
 # LIQUIDITY POOL MAPPER MODULES
 from config import (
+    ARBITRAGE_COLOR,
     DETACH,
-    COLOR,
     BUTTONS,
-    CHUNK,
     DARK_THEME,
     HEIGHT,
     SCALE_WEIGHT,
     DETACH_UNFUNDED,
     ATTACH,
 )
+from arbitrage import ArbitrageGraph, export_cycles
+from detail import cluster_script, level_of_detail
+from feeds import feed_premiums, reference_feeds, refresh_feeds
+from history import HISTORY
+from layout import cached_layout, export_graph
+from metrics import METRICS
+from nodes import NodePool
+from replay import ARCHIVE
 from rpc import (
-    wss_handshake,
-    get_max_object,
-    rpc_get_objects,
-    rpc_ticker,
-    get_liquidity_pool_volume,
-    rpc_get_feed,
+    aget_max_object,
+    arpc_get_objects,
+    asubscribe,
+    anotices,
+    astream_batches,
+    RPCError,
 )
-from utilities import chunks, json_ipc, dprint, logo, PATH, sigfig, NIL
+from store import (
+    migrate,
+    read_accounts,
+    read_assets,
+    read_feeds,
+    read_mark,
+    read_pools,
+    read_tickers,
+    update_pools,
+    write_assets,
+    write_mark,
+    write_pools,
+    write_tickers,
+)
+from taxonomy import GROUPS, ISSUER_RULES, refresh_issuers
+from tickers import pool_prices, refresh_tickers, ticker_prices
+from utilities import asset_entry, dprint, logo, instance, PATH, sigfig, NIL
+from watch import EventServer, page_script
+from weights import pool_weights
 
 
 def init_pipe():
     """
-    Create the pipe files if they don't exist
+    Create the cache database, migrating any legacy pipe files into it
     :return: None
     """
     if not exists(PATH):
         system(f"mkdir {PATH}")
-    filenames = {
-        "id_cache.txt": "[]",
-        "name_cache.txt": "{}",
-        "pool_cache.txt": "{}",
-        "ticker_cache.txt": "{}",
-        "share_cache.txt": "[]",
-        "named_share_cache.txt": "{}",
-    }
-    for filename, initial_content in filenames.items():
-        filepath = f"{PATH}/{filename}"
-        if not exists(filepath):
-            json_ipc(filename, initial_content)
+    migrate()
 
 
-def cache_pool_data(rpc):
+async def stream_pools(rpc, outbox):
     """
-    some RPC calls can be done once, move them to disk
+    stage 1: scan every known pool plus the range beyond the high-water mark,
+    queueing each batch of pools the moment it returns
     :return: None
     """
-    id_cache, data2 = [], []
-    max_obj = get_max_object(rpc, space="1.19.")
-    # for each object between 1.19.0 and 1.19.maxobj
-    for obj in range(0, max_obj + 1, CHUNK):
-        # read the id_cache
-        id_cache = json_ipc("id_cache.txt")
-        # only request this object if it is not already in the id_cache
-        objs = [
-            obj + addendum
-            for addendum in range(CHUNK)
-            if f"1.19.{obj + addendum}" not in id_cache
-        ]
-        # request a chunk of objects
-        data = rpc_get_objects(rpc, [f"1.19.{o}" for o in objs])
-        data2 = []
-        share_cache = json_ipc("share_cache.txt")
-        # read the pool id_cache
-        pool_cache = json_ipc("pool_cache.txt")
-        # for every object received from the call
-        for key, value in data.items():
-            # add the pool and its assets to the pool_cache, if not there already
-            if key not in pool_cache:
-                pool_cache[key] = {
-                    "asset_a": value["asset_a"],
-                    "asset_b": value["asset_b"],
-                    "balance_a": int(value["balance_a"]),
-                    "balance_b": int(value["balance_b"]),
-                    "share_asset": value["share_asset"],
-                }
-            data2.extend((value["asset_a"], value["asset_b"]))
-            share_cache.append(value["share_asset"])
-
-        # asset ids found in this round
-        data2 = list(set(data2))
-        data2 = [f"1.3.{str(i)}" for i in sorted(int(i.split(".")[-1]) for i in data2)]
-        # previously found asset ids
-        id_cache = list(set(id_cache))
-        id_cache = [
-            f"1.3.{str(i)}" for i in sorted(int(i.split(".")[-1]) for i in id_cache)
-        ]
-        # all known asset ids in pools
-        asset_ids = list(set(id_cache + data2))
-        dprint("\nobj", obj)
-        dprint("\ndata", data)
-        dprint("\nobjs", objs)
-        dprint("\ndata2", data2)
-        dprint("\ncache", id_cache)
-        # update the caches
-        json_ipc("pool_cache.txt", pool_cache)
-        json_ipc("id_cache.txt", asset_ids)
-        json_ipc("share_cache.txt", share_cache)
-    pool_cache = json_ipc("pool_cache.txt")
-    dprint("\ncache + data2", id_cache + data2)
-    dprint("\npool_cache", pool_cache)
-    # sort the id id_cache
-    id_cache = json_ipc("id_cache.txt")
-    id_cache = [
-        f"1.3.{str(i)}" for i in sorted(int(i.split(".")[-1]) for i in id_cache)
-    ]
-    # save to disk
-    json_ipc("id_cache.txt", id_cache)
+    pool_cache = read_pools()
+    mark = read_mark("1.19.")
+    max_obj = await aget_max_object(rpc, "1.19.", start=mark)
+    dprint("\nmax_obj", max_obj)
+    # only the range beyond the high-water mark can hold new pools
+    first = 0 if mark is None else mark + 1
+    pool_ids = [*pool_cache, *(f"1.19.{obj}" for obj in range(first, max_obj + 1))]
+    scanned, changed = 0, 0
+    # extended pool objects carry both the static fields and 24h statistics
+    async for _, batch in astream_batches(
+        rpc, "get_liquidity_pools", pool_ids, False, True
+    ):
+        batch = [i for i in batch if i]
+        # a pool share asset 1.3.x keeps its supply in dynamic asset data 2.3.x
+        supplies = await arpc_get_objects(
+            rpc, [i["share_asset"].replace("1.3.", "2.3.", 1) for i in batch]
+        )
+        pools = {
+            i["id"]: {
+                "asset_a": i["asset_a"],
+                "asset_b": i["asset_b"],
+                "balance_a": int(i["balance_a"]),
+                "balance_b": int(i["balance_b"]),
+                "share_asset": i["share_asset"],
+                "share_supply": int(
+                    supplies.get(i["share_asset"].replace("1.3.", "2.3.", 1), {}).get(
+                        "current_supply", 0
+                    )
+                ),
+                "volume": int(i["statistics"]["_24h_exchange_a2b_amount_a"])
+                + int(i["statistics"]["_24h_exchange_b2a_amount_a"]),
+                "taker_fee": int(i["taker_fee_percent"]),
+            }
+            for i in batch
+        }
+        # one upsert transaction touching only the new pools and those that moved
+        changes = {k: v for k, v in pools.items() if pool_cache.get(k) != v}
+        dprint("\nchanged pools", changes)
+        write_pools(changes)
+        METRICS.cache("pools", len(pools) - len(changes), len(changes))
+        HISTORY["pools"].append(pool_history(pools))
+        scanned, changed = scanned + len(pools), changed + len(changes)
+        await outbox.put(pools)
+    write_mark("1.19.", max_obj)
+    print(f"scanned {scanned} pools up to 1.19.{max_obj}, {changed} new or changed")
+    await outbox.put(None)
 
 
-def cache_asset_name(rpc):
+async def stream_names(rpc, inbox, outbox, name_cache, named_share_cache):
     """
-    gather asset names and precisions; cache to disk
+    stage 2: resolve the names and precisions of any unseen assets in each batch
     :return: None
     """
-    id_cache = json_ipc("id_cache.txt")
-    share_cache = json_ipc("share_cache.txt")
-    for idx, cache in enumerate([id_cache, share_cache]):
-        cache_file = "named_share_cache.txt" if idx else "name_cache.txt"
-        dprint("id_cache", cache)
-        # chunk the id_cache into sections of 10
-        cid = chunks(cache, len(cache) // 2)
-        # iterate through each chunk
-        for objs in cid:
-            # load the asset id:name name_cache
-            name_cache = json_ipc(cache_file)
-            objs2 = [obj for obj in objs if obj not in name_cache]
-            if objs2:
-                data = rpc_get_objects(rpc, objs2)
-                data2 = [
-                    {"symbol": v["symbol"], "precision": v["precision"]}
-                    for k, v in data.items()
-                ]
-                # update the name_cache
-                json_ipc(cache_file, {**dict(zip(objs2, data2)), **name_cache})
-
-
-def cache_weights(rpc):
-    """
-    ticker_cache will be used to scale the amounts in each pool
-    back to BTS core token to visualize on equal terms
+    while (pools := await inbox.get()) is not None:
+        missing = {
+            "assets": {
+                i[k]
+                for i in pools.values()
+                for k in ["asset_a", "asset_b"]
+                if i[k] not in name_cache
+            },
+            "share_assets": {
+                i["share_asset"]
+                for i in pools.values()
+                if i["share_asset"] not in named_share_cache
+            },
+        }
+        # both tables are filled by a single get_objects pass
+        data = await arpc_get_objects(rpc, sorted(set().union(*missing.values())))
+        wanted = {
+            "assets": pool_assets(pools),
+            "share_assets": {i["share_asset"] for i in pools.values()},
+        }
+        for table, cache in [
+            ("assets", name_cache),
+            ("share_assets", named_share_cache),
+        ]:
+            found = {
+                k: asset_entry(data[k])
+                for k in missing[table]
+                if k in data
+            }
+            cache.update(found)
+            write_assets(found, table)
+            METRICS.cache(table, len(wanted[table] - missing[table]), len(missing[table]))
+        await outbox.put(pools)
+    await outbox.put(None)
+
+
+async def stream_tickers(rpc, inbox, outbox, ticker_cache, name_cache):
+    """
+    stage 3: value each batch's assets through the pools scanned so far;
+    a batch with an asset no pool path reaches yet is held until the scan
+    ends, then get_ticker prices only what is still unreachable
     :return: None
     """
+    scanned, held = {}, []
+
+    async def release(ready, prices):
+        now = time.time()
+        for pools in ready:
+            local = {
+                k: {"price": prices[k], "time": now}
+                for k in pool_assets(pools)
+                if k in prices
+            }
+            ticker_cache.update(local)
+            write_tickers(local)
+            HISTORY["tickers"].append(ticker_history(local))
+            METRICS.cache("pool_prices", hits=len(local))
+            await outbox.put(pools)
+
+    while (pools := await inbox.get()) is not None:
+        scanned.update(pools)
+        held.append(pools)
+        prices = pool_prices(scanned, name_cache)
+        await release([i for i in held if pool_assets(i) <= prices.keys()], prices)
+        held = [i for i in held if not pool_assets(i) <= prices.keys()]
+    if held:
+        prices = pool_prices(scanned, name_cache)
+        orphans = set().union(*map(pool_assets, held)) - prices.keys()
+        METRICS.cache("pool_prices", misses=len(orphans))
+        dprint("\nassets without a pool path to BTS", orphans)
+        # the fallback tickers keep their TTL, pool prices are always current
+        await refresh_tickers(rpc, ticker_cache, orphans)
+        write_tickers({k: ticker_cache[k] for k in orphans | {"1.3.0"}})
+        HISTORY["tickers"].append(ticker_history({k: ticker_cache[k] for k in orphans}))
+        await release(held, prices)
+    await outbox.put(None)
+
+
+def pool_history(pools):
+    """
+    :return: the history rows of a batch of pools
+    """
+    return {
+        instance(k): (v["balance_a"], v["balance_b"], v["volume"] or 0)
+        for k, v in pools.items()
+    }
+
+
+def ticker_history(tickers):
+    """
+    :return: the history rows of a batch of tickers
+    """
+    return {instance(k): (v["price"],) for k, v in tickers.items()}
+
+
+def pool_assets(pools):
+    """
+    :return: the set of asset ids traded in a batch of pools
+    """
+    return {i[k] for i in pools.values() for k in ["asset_a", "asset_b"]}
+
+
+async def stream_weights(inbox, weights, name_cache, named_share_cache, ticker_cache):
+    """
+    stage 4: append the edge weights of each batch as its tickers resolve
+    :return: None
+    """
+    while (pools := await inbox.get()) is not None:
+        weights.extend(
+            pool_weights(
+                pools, ticker_prices(ticker_cache), name_cache, named_share_cache
+            )
+        )
+
+
+async def collect(rpc):
+    """
+    run every stage at once, linked by queues, so each batch of pools
+    flows from the scan through names and tickers to weights in memory;
+    the caches are still written as each stage goes but never read back;
+    the feeds of the market pegged assets found, and the issuers the
+    taxonomy needs, are resolved last
+    :return: weights, name_cache, ticker_cache, feed_cache
+    """
+    name_cache = read_assets()
+    named_share_cache = read_assets("share_assets")
+    ticker_cache = read_tickers()
     weights = []
-    pool_cache = json_ipc("pool_cache.txt")
-    name_cache = json_ipc("name_cache.txt")
-    named_share_cache = json_ipc("named_share_cache.txt")
-    ticker_cache = json_ipc("ticker_cache.txt")
-    pools_chunked = chunks(list(pool_cache.keys()), 100)
-    volumes = {}
-    ticker_cache["1.3.0"] = 1
-    for chunk in pools_chunked:
-        volumes = {**volumes, **get_liquidity_pool_volume(rpc, chunk)}
-    for pool, item in pool_cache.items():
-        dprint(name_cache[item["asset_a"]])
-        ticker = {"asset_a": 0, "asset_b": 0}
-        for i in ["asset_a", "asset_b"]:
-            # if the token is BTS, the ticker is 1
-            if item[i] == "1.3.0":
-                ticker[i] = 1
-            elif item[i] in ticker_cache:
-                ticker[i] = ticker_cache[item[i]]
-            else:
-                ticker[i] = rpc_ticker(rpc, f"1.3.0:{item[i]}")
-                ticker_cache[item[i]] = ticker[i]
-        ticker_a = ticker["asset_a"]
-        ticker_b = ticker["asset_b"]
-        precision_a = name_cache[item["asset_a"]]["precision"]
-        precision_b = name_cache[item["asset_b"]]["precision"]
-        balance_a = item["balance_a"]
-        balance_b = item["balance_b"]
-        volume_a = volumes[pool]
-        dprint(ticker_cache)
-        dprint("v0, v1", item["asset_a"], item["asset_b"])
-        dprint("ticker_a, balance_a, precision_a")
-        dprint(ticker_a, balance_a, precision_a)
-        dprint("ticker_b, balance_b, precision_b")
-        dprint(ticker_b, balance_b, precision_b)
-        wt_balance = (
-            ticker_a * balance_a / 10**precision_a
-            + ticker_b * balance_b / 10**precision_b
+    pools, names, tickers = asyncio.Queue(), asyncio.Queue(), asyncio.Queue()
+    with METRICS.stage("collect"):
+        await asyncio.gather(
+            timed("pools", stream_pools(rpc, pools)),
+            timed(
+                "names", stream_names(rpc, pools, names, name_cache, named_share_cache)
+            ),
+            timed(
+                "tickers", stream_tickers(rpc, names, tickers, ticker_cache, name_cache)
+            ),
+            timed(
+                "weights",
+                stream_weights(
+                    tickers, weights, name_cache, named_share_cache, ticker_cache
+                ),
+            ),
         )
-        wt_volume = ticker_a * volume_a / 10**precision_a
-        human_balance_a = balance_a / 10**precision_a
-        human_balance_b = balance_b / 10**precision_b
-        price = human_balance_a / (human_balance_b + NIL)
-        inverse = 1 / (price + NIL)
-        # add the edge weights
-        weights.append(
-            {
-                "asset_a": item["asset_a"],
-                "asset_b": item["asset_b"],
-                "wt_balance": math.log(wt_balance + 1),
-                "wt_volume": math.log(wt_volume + 1),
-                "pool_id": pool,
-                "pool_name": named_share_cache[item["share_asset"]]["symbol"],
-                "balance_a": human_balance_a,
-                "balance_b": human_balance_b,
-                "price": price,
-                "inverse": inverse,
-            }
+        # the assets table also holds assets of transfers and feeds, only
+        # pooled assets are checked for a feed; backing assets of a feed may
+        # join the name_cache without a ticker, so map_network skips them
+        pooled = {i[k] for i in weights for k in ["asset_a", "asset_b"]}
+        feed_cache = await timed(
+            "feeds", refresh_feeds(rpc, read_feeds(), name_cache, sorted(pooled))
         )
+        await timed("issuers", refresh_issuers(rpc, name_cache))
+    return weights, name_cache, ticker_prices(ticker_cache), feed_cache
 
-    json_ipc("ticker_cache.txt", ticker_cache)
-    return weights
+
+async def timed(name, stage):
+    """
+    time one streaming stage from its start until its queue is drained;
+    the stages share the event loop so only collect as a whole is profiled
+    """
+    with METRICS.stage(name, profile=False):
+        return await stage
 
 
-def map_network(rpc, weights, choice, is_balance):
+def map_network(
+    weights,
+    name_cache,
+    ticker_cache,
+    feeds,
+    choice,
+    is_balance,
+    live=False,
+    highlight=(),
+    show=True,
+    output="liquidity_pools",
+):
     """
     build a pyvis network map of the BitShares Liquidity Pools
     :param weights: will be used for edge thickness
-    :return:
+    :param feeds: the feed_cache of every market pegged asset
+    :param live: open the map listening for watch_network updates
+    :param highlight: pool ids drawn in ARBITRAGE_COLOR
+    :param show: open the map in a browser, else only write it
+    :param output: file name of the .html map and its .json graph
+    :return: the edge weight scale and the mapped pool ids
     """
-    name_cache = json_ipc("name_cache.txt")
-    ticker_cache = json_ipc("ticker_cache.txt")
-    usd_feed = rpc_get_feed(rpc, "2.4.294")
-    btc_feed = rpc_get_feed(rpc, "2.4.295")
+    references = reference_feeds(feeds)
+    premiums = feed_premiums(feeds, ticker_cache)
     bgcolor = "#222222" if DARK_THEME else "#888888"
     font_color = "#888888" if DARK_THEME else "#222222"
 
-    node_colors = []
-    for symbol in [i["symbol"] for i in name_cache.values()]:
-        # re-declare the color map logic with a new symbol
-        node_color_mapping = {
-            COLOR[0]: "HONEST" in symbol,
-            COLOR[1]: ("GDEX" in symbol) or (symbol in ["DEFI", "GAT"]),
-            COLOR[2]: (symbol in ["GOLD", "SILVER", "CNY 1.0"]) or (len(symbol) == 3),
-            COLOR[3]: ("BTWTY" in symbol) or ("TWENTIX" in symbol),
-            COLOR[4]: "IOB" in symbol,
-            COLOR[5]: "CRUDE" in symbol,
-            COLOR[6]: "XBTSX" in symbol,
-            COLOR[7]: symbol in ["NIUSHI", "NSNFT"],
-            COLOR[8]: symbol in ["GOLDBACK", "QUINT", "BEOS"],
-            COLOR[9]: True,
-        }
-        for color, condition in node_color_mapping.items():
-            if condition:
-                node_colors.append(color)
-                break
+    # one taxonomy group per asset colors, detaches and clusters the map
+    families = GROUPS.classify_all(
+        name_cache, read_accounts() if ISSUER_RULES else {}
+    )
+    detached = {k for k, v in families.items() if v in DETACH}
+    # the assets table is shared with transfers and feeds, whose assets
+    # need not be in any pool nor have a ticker, so only pooled assets are mapped
+    pooled = {i[k] for i in weights for k in ["asset_a", "asset_b"]}
+    assets = [i for i in name_cache if i in pooled]
 
     node_title = [
-        "Value of {}:\n\nBTS: {:.3f}\nUSD: {:.3f}\nBTC: {:.3f}".format(
-            symbol,
-            1 / (ticker_cache[symbol] + NIL),
-            1 / ((ticker_cache[symbol] + NIL) / usd_feed),
-            1 / ((ticker_cache[symbol] + NIL) / btc_feed),
+        f"Value of {symbol}:\n\nBTS: {1 / (ticker_cache[symbol] + NIL):.3f}"
+        + "".join(
+            f"\n{unit}: {feed / (ticker_cache[symbol] + NIL):.3f}"
+            for unit, feed in references.items()
         )
-        for symbol in name_cache.keys()
+        + (
+            "\n\nFeed: {:.6g} {} premium: {:+.2%}".format(
+                feeds[symbol]["price"],
+                name_cache[feeds[symbol]["backing"]]["symbol"],
+                premiums[symbol],
+            )
+            if symbol in premiums
+            else ""
+        )
+        for symbol in assets
     ]
     net = Network(
         height=f"{HEIGHT}px",
@@ -279,18 +366,48 @@ def map_network(rpc, weights, choice, is_balance):
         font_color=font_color,
         select_menu=True,
     )
+    edges = [
+        weight
+        for weight in weights
+        if all(
+            [
+                weight["asset_a"] in name_cache,
+                weight["asset_b"] in name_cache,
+                (not DETACH_UNFUNDED or weight["wt_balance"] > 0),
+                (weight["asset_a"] not in detached or choice != 2),
+                (weight["asset_b"] not in detached or choice != 2),
+                ((weight["pool_id"] in ATTACH) or choice != 1),
+            ]
+        )
+    ]
+    titles = dict(zip(assets, node_title))
+    # solve the node positions here so the browser opens a settled map; the
+    # layout covers every pool, since the dust pruned below shifts as
+    # balances drift while the topology stays the same
+    positions = cached_layout(assets, [(i["asset_a"], i["asset_b"]) for i in edges])
+    # large maps drop dust pools and fold leaf assets into clusters
+    detailed, clusters = level_of_detail(
+        edges, families, len(assets), set(highlight) | ATTACH
+    )
+    if detailed is None:
+        shown = assets
+    else:
+        edges = detailed
+        linked = {i[k] for i in edges for k in ["asset_a", "asset_b"]}
+        shown = [i for i in assets if i in linked]
     net.add_nodes(
-        list(name_cache.keys()),
-        label=[i["symbol"] for i in list(name_cache.values())],
-        color=node_colors,
-        size=[10 for _ in name_cache],
-        title=node_title,
+        shown,
+        label=[name_cache[i]["symbol"] for i in shown],
+        color=[GROUPS.colors[families[i]] for i in shown],
+        size=[10 for _ in shown],
+        title=[titles[i] for i in shown],
+        x=[positions[i][0] for i in shown],
+        y=[positions[i][1] for i in shown],
     )
-    net.add_node("", label="", image="./images/bitshares.png", size=500, shape="image", mass=0.5)
-    net.add_node(" ", label="", image="./images/pool_network.png", size=100, shape="image", mass=0.7)
+    net.add_node("", label="", image="./images/bitshares.png", size=500, shape="image", mass=0.5, x=0, y=-1.5 * HEIGHT)
+    net.add_node(" ", label="", image="./images/pool_network.png", size=100, shape="image", mass=0.7, x=0, y=-0.8 * HEIGHT)
     dprint("\n\n")
     dprint(net.get_nodes())
-    pool_cache = json_ipc("pool_cache.txt")
     # calculate max balance or volume weight based on user choice
     # at the same time, if user choice is 1 only ATTACH some weights
     max_w = max(
@@ -300,48 +417,151 @@ def map_network(rpc, weights, choice, is_balance):
     )
     dprint(max_w)
     max_w /= SCALE_WEIGHT
-    for weight in weights:
-        if all(
-            [
-                weight["asset_a"] in name_cache,
-                weight["asset_b"] in name_cache,
-                (not DETACH_UNFUNDED or weight["wt_balance"] > 0),
-                (weight["asset_a"] not in DETACH or choice != 2),
-                (weight["asset_b"] not in DETACH or choice != 2),
-                ((weight["pool_id"] in ATTACH) or choice != 1),
-            ]
-        ):
-            net.add_edge(
-                weight["asset_a"],
-                weight["asset_b"],
-                value=weight["wt_balance"] / max_w if is_balance else weight["wt_volume"] / max_w,
-                title="{}\n{} {}\n\n{} {}\n{} {}\n\nprice   {}\ninverse {}".format(
-                    weight["pool_id"],
-                    pool_cache[weight["pool_id"]]["share_asset"],
-                    weight["pool_name"],
-                    weight["asset_a"],
-                    str(weight["balance_a"]),
-                    weight["asset_b"],
-                    str(weight["balance_b"]),
-                    str(sigfig(weight["price"])),
-                    str(sigfig(weight["inverse"])),
-                ),
-            )
+    for weight in edges:
+        net.add_edge(
+            weight["asset_a"],
+            weight["asset_b"],
+            id=weight["pool_id"],
+            value=edge_value(weight, max_w, is_balance),
+            title=edge_title(weight),
+            **({"color": ARBITRAGE_COLOR} if weight["pool_id"] in highlight else {}),
+        )
 
+    # nodes keep their positions until physics is switched on from the buttons
+    net.toggle_physics(False)
     net.show_buttons(filter_=BUTTONS)
-    net.show("liquidity_pools.html")
+    export_graph(net, f"{output}.json")
+    # the live page listens for edge updates pushed by watch_network
+    scripts = (page_script() if live else "") + (
+        cluster_script(
+            clusters,
+            {i: name_cache[i]["symbol"] for i in clusters},
+            {i: GROUPS.colors[families[i]] for i in clusters},
+        )
+        if clusters
+        else ""
+    )
+    if scripts:
+        net.write_html(f"{output}.html")
+        with open(f"{output}.html", "r+", encoding="utf-8") as handle:
+            html = handle.read().replace("</body>", scripts + "</body>", 1)
+            handle.seek(0)
+            handle.write(html)
+        if live or show:
+            webbrowser.open(f"file://{abspath(f'{output}.html')}")
+    elif show:
+        net.show(f"{output}.html")
+    else:
+        net.write_html(f"{output}.html")
+    return max_w, [i["pool_id"] for i in edges]
 
 
-def initialize():
+def edge_value(weight, max_w, is_balance):
     """
-    gather necessary data from disk or rpc as required
-    :return: weights
+    line thickness of a pool edge, scaled to the heaviest mapped pool
     """
-    init_pipe()
-    rpc = wss_handshake()
-    cache_pool_data(rpc)
-    cache_asset_name(rpc)
-    return cache_weights(rpc), rpc
+    return weight["wt_balance"] / max_w if is_balance else weight["wt_volume"] / max_w
+
+
+def edge_title(weight):
+    """
+    hover text of a pool edge
+    """
+    return "{}\n{} {}\n\n{} {}\n{} {}\n\nprice   {}\ninverse {}".format(
+        weight["pool_id"],
+        weight["share_asset"],
+        weight["pool_name"],
+        weight["asset_a"],
+        str(weight["balance_a"]),
+        weight["asset_b"],
+        str(weight["balance_b"]),
+        str(sigfig(weight["price"])),
+        str(sigfig(weight["inverse"])),
+    )
+
+
+def pool_notice(item, pools, ticker_cache, name_cache, named_share_cache):
+    """
+    store the new balances of one changed pool object
+    :return: its new edge weight
+    """
+    changes = {
+        item["id"]: {
+            "balance_a": int(item["balance_a"]),
+            "balance_b": int(item["balance_b"]),
+        }
+    }
+    pools.update(changes)
+    update_pools(changes)
+    HISTORY["pools"].append(pool_history({item["id"]: pools[item["id"]]}))
+    return pool_weights(
+        {item["id"]: pools[item["id"]]}, ticker_cache, name_cache, named_share_cache
+    )[0]
+
+
+async def watch_network(
+    rpc, pool_ids, name_cache, ticker_cache, max_w, is_balance, arbitrage
+):
+    """
+    subscribe to every mapped pool and push each balance change to the open
+    map as new edge widths and titles; runs until interrupted, resubscribing
+    on another node whenever the subscribed connection drops
+    :param arbitrage: the ArbitrageGraph of the mapped weights, kept current
+        so cycle highlights follow every change
+    :return: None
+    """
+    mapped = set(pool_ids)
+    highlight = {
+        pool for cycle in arbitrage.cycles() for pool in cycle["pools"]
+    } & mapped
+    pools = read_pools()
+    named_share_cache = read_assets("share_assets")
+    server = await EventServer().start()
+    print(f"watching {len(pool_ids)} pools, pushing updates on port {server.port}")
+    try:
+        while True:
+            node = await rpc.pick()
+            try:
+                await asubscribe(rpc.live[node], pool_ids)
+                async for item in anotices(rpc.live[node]):
+                    # the notices of a subscription also carry orders,
+                    # balances and accounts whose instance matches a pool
+                    item_id = str(item.get("id"))
+                    if not item_id.startswith("1.19.") or item_id not in pools:
+                        continue
+                    try:
+                        weight = pool_notice(
+                            item, pools, ticker_cache, name_cache, named_share_cache
+                        )
+                    except (KeyError, TypeError, ValueError) as error:
+                        print(f"skipped notice for {item['id']} with {error!r}")
+                        continue
+                    arbitrage.update([weight])
+                    cycles = arbitrage.cycles()
+                    now = {pool for cycle in cycles for pool in cycle["pools"]} & mapped
+                    if now != highlight:
+                        export_cycles(cycles, "arbitrage.json")
+                    dprint("\npushed", weight)
+                    # null restores the default edge color on the page
+                    server.push(
+                        [
+                            {
+                                "id": weight["pool_id"],
+                                "value": edge_value(weight, max_w, is_balance),
+                                "title": edge_title(weight),
+                            }
+                        ]
+                        + [
+                            {"id": pool, "color": ARBITRAGE_COLOR if pool in now else None}
+                            for pool in now ^ highlight
+                        ]
+                    )
+                    highlight = now
+            except (ConnectionError, RPCError) as error:
+                print(f"{node} subscription lost with {error!r}, resubscribing...")
+                await rpc.drop(node)
+    finally:
+        await server.close()
 
 
 def menu():
@@ -356,6 +576,7 @@ def menu():
                 "ATTACH Configured Pools Only",
                 "DETACH Configured Tokens",
                 "Clear Cache",
+                "Watch Full Network Live",
             ]
         )
     )
@@ -364,11 +585,6 @@ def menu():
     print("\nScale pool size in BTS terms by...")
     dispatch = dict(enumerate(["24hr Volume", "Total A + B Balance"]))
     is_balance = get_choice(dispatch)
-    if choice == 3:
-        # clear cache
-        rmtree(PATH)
-        system(f"mkdir {PATH}")
-        main()
     return choice, is_balance
 
 
@@ -382,6 +598,58 @@ def get_choice(dispatch):
     return result
 
 
+async def run():
+    """
+    show the menu at once while every data stage streams in behind it,
+    then map the network as soon as both are done
+    """
+    init_pipe()
+    with METRICS.stage("connect", profile=False):
+        rpc = await NodePool().connect()
+    collecting = asyncio.ensure_future(collect(rpc))
+    # the menu blocks on input(), keep it off the event loop
+    choice, is_balance = await asyncio.to_thread(menu)
+    if choice == 3:
+        # clear cache, the stages must not write into the new one
+        collecting.cancel()
+        await asyncio.gather(collecting, return_exceptions=True)
+        await rpc.close()
+        rmtree(PATH)
+        system(f"mkdir {PATH}")
+        print(logo())
+        print("\n\nCaching data...")
+        await run()
+        return
+    weights, name_cache, ticker_cache, feeds = await collecting
+    # price inconsistencies between pools are highlighted on the map
+    with METRICS.stage("arbitrage"):
+        arbitrage = ArbitrageGraph()
+        arbitrage.update(weights)
+        cycles = arbitrage.cycles()
+    export_cycles(cycles, "arbitrage.json")
+    print(f"found {len(cycles)} arbitrage cycles")
+    highlight = {pool for cycle in cycles for pool in cycle["pools"]}
+    with METRICS.stage("map_network"):
+        max_w, pool_ids = map_network(
+            weights,
+            name_cache,
+            ticker_cache,
+            feeds,
+            choice,
+            is_balance,
+            choice == 4,
+            highlight,
+        )
+    # the report covers the run up to the map, watch mode has no end
+    METRICS.write()
+    ARCHIVE.save()
+    if choice == 4:
+        await watch_network(
+            rpc, pool_ids, name_cache, ticker_cache, max_w, is_balance, arbitrage
+        )
+    await rpc.close()
+
+
 def main():
     """
     initialize data via rpc and on disk cache
@@ -390,9 +658,7 @@ def main():
     """
     print(logo())
     print("\n\nCaching data...")
-    weights, rpc = initialize()
-    choice, is_balance = menu()
-    map_network(rpc, weights, choice, is_balance)
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
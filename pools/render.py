@@ -0,0 +1,131 @@
+# pylint: disable=broad-except
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Headless batch renderer
+
+collects weights, feeds and arbitrage cycles once, then renders every
+requested map variant in a process pool without a menu, each to its own
+<prefix>_<variant>_<scale>.html and .json; exits non zero if anything
+failed, so it can run from cron
+
+    python3 render.py --variants full attach detach --scales volume balance
+"""
+
+# STANDARD PYTHON MODULES
+import argparse
+import asyncio
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# LIQUIDITY POOL MAPPER MODULES
+from arbitrage import ArbitrageGraph, export_cycles
+from metrics import METRICS
+from nodes import NodePool
+from pool_mapper import collect, init_pipe, map_network
+from replay import ARCHIVE
+
+# the menu choices and scales by command line name
+VARIANTS = {"full": 0, "attach": 1, "detach": 2}
+SCALES = {"volume": 0, "balance": 1}
+
+
+async def gather_data():
+    """
+    one pass of every data stage, as the interactive run does it
+    :return: weights, name_cache, ticker_cache, feed_cache
+    """
+    init_pipe()
+    with METRICS.stage("connect", profile=False):
+        rpc = await NodePool().connect()
+    try:
+        return await collect(rpc)
+    finally:
+        await rpc.close()
+
+
+def render_variant(data, variant, scales, highlight, prefix):
+    """
+    worker: every scale of one variant, which all share one node layout
+    :return: the file names written, without extension
+    """
+    weights, name_cache, ticker_cache, feeds = data
+    written = []
+    for scale in scales:
+        output = f"{prefix}_{variant}_{scale}"
+        map_network(
+            weights,
+            name_cache,
+            ticker_cache,
+            feeds,
+            VARIANTS[variant],
+            SCALES[scale],
+            highlight=highlight,
+            show=False,
+            output=output,
+        )
+        written.append(output)
+    return written
+
+
+def render(args):
+    """
+    collect once and render every variant in parallel
+    :return: the number of variants that failed
+    """
+    data = asyncio.run(gather_data())
+    with METRICS.stage("arbitrage"):
+        arbitrage = ArbitrageGraph()
+        arbitrage.update(data[0])
+        cycles = arbitrage.cycles()
+    export_cycles(cycles, f"{args.prefix}_arbitrage.json")
+    highlight = {pool for cycle in cycles for pool in cycle["pools"]}
+    failed = 0
+    with METRICS.stage("render", profile=False):
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            jobs = {
+                variant: pool.submit(
+                    render_variant, data, variant, args.scales, highlight, args.prefix
+                )
+                for variant in args.variants
+            }
+            for variant, job in jobs.items():
+                try:
+                    print("rendered", *(f"{i}.html" for i in job.result()))
+                except Exception:
+                    print(f"{variant} map failed")
+                    traceback.print_exc()
+                    failed += 1
+    METRICS.write()
+    ARCHIVE.save()
+    return failed
+
+
+def main():
+    """
+    parse the variants to render, exit 1 on any failure
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[-2])
+    parser.add_argument(
+        "--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS)
+    )
+    parser.add_argument(
+        "--scales", nargs="+", choices=list(SCALES), default=list(SCALES)
+    )
+    parser.add_argument("--prefix", default="liquidity_pools")
+    parser.add_argument("--jobs", type=int, default=None)
+    try:
+        failed = render(parser.parse_args())
+    except Exception:
+        traceback.print_exc()
+        sys.exit(1)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+RPC record and replay
+
+with RPC_MODE = "record" every rpc result is kept and saved at the end
+of the run to RPC_ARCHIVE, a gzipped json snapshot of the chain; with
+RPC_MODE = "replay" AsyncRPC.query answers from that snapshot instead
+and never opens a websocket, so a map can be regenerated offline and
+identically as often as needed
+
+only the calls that went over the wire are recorded, and a warm run
+answers most of the chain from the pipe cache, so record with the pipe
+folder cleared to replay a cold run; a recording taken on a warm cache
+replays only on top of that same cache
+
+get_objects style calls are archived one object id at a time, since
+the adaptive batching splits the same ids differently on every run
+"""
+
+# STANDARD PYTHON MODULES
+import gzip
+from json import dumps as json_dumps
+from json import load as json_load
+from os.path import abspath, dirname, isabs
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import RPC_ARCHIVE, RPC_MODE
+from metrics import METRICS
+
+# methods whose first param is a list of ids answered by a list of results
+BATCHED = {"get_objects", "get_liquidity_pools"}
+
+
+class RPCArchive:
+    """
+    rpc results keyed by their params
+    """
+
+    def __init__(self, mode=RPC_MODE, path=RPC_ARCHIVE):
+        self.mode = mode
+        self.path = path if isabs(path) else f"{dirname(abspath(__file__))}/{path}"
+        self.results = {}
+        self.loaded = False
+
+    @property
+    def replaying(self):
+        """
+        True when responses come from the archive instead of a node
+        """
+        return self.mode == "replay"
+
+    def record(self, params, ret):
+        """
+        keep the result of one answered request, errors are not archived
+        """
+        if self.mode != "record" or "result" not in ret:
+            return
+        api, method, args = params
+        if method in BATCHED:
+            for object_id, item in zip(args[0], ret["result"]):
+                self.results[json_dumps([api, method, object_id, *args[1:]])] = item
+        else:
+            self.results[json_dumps(params)] = ret["result"]
+
+    def respond(self, params):
+        """
+        answer a request from the archive the way a node would; an id that was
+        never recorded did not exist in the snapshot, any other call that was
+        never recorded is an rpc error
+        :return: the json-rpc response dict
+        """
+        self.load()
+        api, method, args = params
+        if method in BATCHED:
+            keys = [json_dumps([api, method, i, *args[1:]]) for i in args[0]]
+            hits = sum(key in self.results for key in keys)
+            METRICS.cache("replay", hits, len(keys) - hits)
+            return {"result": [self.results.get(key) for key in keys]}
+        key = json_dumps(params)
+        METRICS.cache("replay", key in self.results, key not in self.results)
+        if key not in self.results:
+            return {"error": {"message": f"{method} {args} is not in {self.path}"}}
+        return {"result": self.results[key]}
+
+    def load(self):
+        """
+        read the archive once, on the first replayed request
+        """
+        if not self.loaded:
+            with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+                self.results = json_load(handle)
+            self.loaded = True
+
+    def save(self):
+        """
+        write everything recorded this run, replacing the previous snapshot
+        """
+        if self.mode != "record":
+            return
+        with gzip.open(self.path, "wt", encoding="utf-8") as handle:
+            handle.write(json_dumps(self.results, separators=(",", ":")))
+        print(f"recorded {len(self.results)} rpc results to {self.path}")
+
+
+ARCHIVE = RPCArchive()
@@ -0,0 +1,297 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Trade route simulator
+
+every pool is a constant product market that pays out
+balance_out * amount / (balance_in + amount), less its taker fee; the
+routes of up to ROUTE_HOPS pools between two assets are padded into
+arrays of pool and side indices, so a grid of trade sizes is pushed
+through every hop of every route in a few vector operations
+
+a large order is split by filling it in ROUTE_STEPS slices, each sent
+down whichever route pays most for it at the balances the earlier
+slices left behind, which also prices routes that share a pool
+
+    python3 routing.py 50000 BTS HONEST.USD
+"""
+
+# STANDARD PYTHON MODULES
+import sys
+import time
+from collections import defaultdict, deque
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import ROUTE_GRID, ROUTE_HOPS, ROUTE_PATHS, ROUTE_STEPS
+from store import read_assets, read_pools
+from utilities import NIL, sigfig
+from weights import pool_columns
+
+
+class Router:
+    """
+    constant product trade simulation over one snapshot of the pools
+
+    :param pool_cache: {"1.19.x": {"asset_a", "balance_a", ...}} raw pools
+    :param name_cache: {"1.3.x": {"symbol", "precision"}}
+    """
+
+    def __init__(self, pool_cache, name_cache):
+        columns = pool_columns(pool_cache, name_cache)
+        precision = columns["precision"]
+        self.pools = columns["pools"]
+        self.assets = columns["assets"]
+        self.symbols = [name_cache[i]["symbol"] for i in self.assets]
+        self.index = {asset: idx for idx, asset in enumerate(self.assets)}
+        # human balances by pool, column 0 for asset_a and 1 for asset_b
+        self.balances = np.stack(
+            [
+                columns["balance_a"] / 10 ** precision[columns["asset_a"]],
+                columns["balance_b"] / 10 ** precision[columns["asset_b"]],
+            ],
+            axis=1,
+        )
+        self.fee = columns["taker_fee"]
+        self.ends = np.stack([columns["asset_a"], columns["asset_b"]], axis=1)
+        # asset: [(pool, side sold into, asset received)], empty pools left out
+        self.links = defaultdict(list)
+        for pool, (asset_a, asset_b) in enumerate(
+            zip(columns["asset_a"].tolist(), columns["asset_b"].tolist())
+        ):
+            if self.balances[pool].all():
+                self.links[asset_a].append((pool, 0, asset_b))
+                self.links[asset_b].append((pool, 1, asset_a))
+        self.routes = {}
+
+    def distances(self, target, hops):
+        """
+        :return: {asset: fewest pools from it to the target}, within hops
+        """
+        dist, queue = {target: 0}, deque([target])
+        while queue:
+            asset = queue.popleft()
+            if dist[asset] < hops:
+                for _, _, other in self.links[asset]:
+                    if other not in dist:
+                        dist[other] = dist[asset] + 1
+                        queue.append(other)
+        return dist
+
+    def paths(self, source, target, hops=ROUTE_HOPS, keep=ROUTE_PATHS):
+        """
+        every route of at most hops pools that visits no asset twice, the
+        keep best by marginal rate, as padded arrays
+        :param source: asset id sold
+        :param target: asset id bought
+        :return: {"pools", "sides": (routes, hops) int arrays padded with -1,
+            "source": the asset index sold}
+        """
+        key = (source, target, hops, keep)
+        if key not in self.routes:
+            start, goal = self.index[source], self.index[target]
+            dist = self.distances(goal, hops)
+            found = []
+
+            def walk(asset, path, seen):
+                if asset == goal:
+                    found.append(path)
+                    return
+                for pool, side, other in self.links[asset]:
+                    # only step where the target is still in reach
+                    reach = dist.get(other, hops + 1) < hops - len(path)
+                    if reach and other not in seen:
+                        walk(other, path + [(pool, side)], seen | {other})
+
+            if start in dist:
+                walk(start, [], {start})
+            pools = np.full((len(found), hops), -1, dtype=np.intp)
+            sides = np.zeros((len(found), hops), dtype=np.intp)
+            for idx, path in enumerate(found):
+                pools[idx, : len(path)] = [i[0] for i in path]
+                sides[idx, : len(path)] = [i[1] for i in path]
+            rate = self.simulate({"pools": pools, "sides": sides}, [0.0])["spot"]
+            best = np.argsort(-rate * (1 - self.path_fee(pools)))[:keep]
+            self.routes[key] = {
+                "pools": pools[best],
+                "sides": sides[best],
+                "source": start,
+            }
+        return self.routes[key]
+
+    def path_fee(self, pools):
+        """
+        :return: the fraction of the output each route keeps back in fees
+        """
+        keep = np.where(pools >= 0, 1 - self.fee[pools], 1)
+        return 1 - keep.prod(axis=1)
+
+    def simulate(self, routes, sizes, balances=None):
+        """
+        push a grid of sizes through every hop of every route at once
+        :param sizes: amounts of the source asset sold
+        :param balances: pool balances to trade against, else the snapshot
+        :return: {"out", "ideal", "fee_cost", "impact": (routes, sizes),
+            "spot": (routes,)}, where ideal is the output without fees and
+            impact the shortfall of ideal from the marginal rate
+        """
+        balances = self.balances if balances is None else balances
+        pools, sides = routes["pools"], routes["sides"]
+        out = np.broadcast_to(np.asarray(sizes, float), (len(pools), len(sizes)))
+        ideal = out
+        spot = np.ones(len(pools))
+        for hop in range(pools.shape[1]):
+            pool, side = pools[:, hop], sides[:, hop]
+            live = (pool >= 0)[:, None]
+            reserve_in = balances[pool, side][:, None]
+            reserve_out = balances[pool, 1 - side][:, None]
+            keep = 1 - self.fee[pool][:, None]
+            out = np.where(live, reserve_out * out / (reserve_in + out) * keep, out)
+            ideal = np.where(live, reserve_out * ideal / (reserve_in + ideal), ideal)
+            spot = np.where(live[:, 0], spot * (reserve_out / reserve_in)[:, 0], spot)
+        return {
+            "out": out,
+            "ideal": ideal,
+            "fee_cost": ideal - out,
+            "impact": 1 - ideal / (np.asarray(sizes) * spot[:, None] + NIL),
+            "spot": spot,
+        }
+
+    def payout(self, routes, amount, balances):
+        """
+        the lean core of simulate for one size, run once per slice of a split
+        :return: what each route pays for amount at the balances given
+        """
+        pools, sides = routes["pools"], routes["sides"]
+        # gather every hop's reserves at once, then walk the hops by column
+        reserve_in, reserve_out = balances[pools, sides], balances[pools, 1 - sides]
+        keep, live = 1 - self.fee[pools], pools >= 0
+        out = np.full(len(pools), float(amount))
+        for hop in range(pools.shape[1]):
+            paid = reserve_out[:, hop] * out / (reserve_in[:, hop] + out) * keep[:, hop]
+            out = np.where(live[:, hop], paid, out)
+        return out
+
+    def trade(self, balances, routes, route, amount):
+        """
+        apply one trade down one route to the balances in place, the taker
+        fee staying in each pool
+        :return: the amount received
+        """
+        for pool, side in zip(routes["pools"][route], routes["sides"][route]):
+            if pool < 0:
+                break
+            paid = (
+                balances[pool, 1 - side]
+                * amount
+                / (balances[pool, side] + amount)
+                * (1 - self.fee[pool])
+            )
+            balances[pool, side] += amount
+            balances[pool, 1 - side] -= paid
+            amount = paid
+        return amount
+
+    def split(self, source, target, amount, steps=ROUTE_STEPS):
+        """
+        fill an order slice by slice down the route paying most for each
+        :return: {"routes": [{"pools", "path", "in", "out"}] busiest first,
+            "in", "out", "single": best output of any one route alone}
+        """
+        routes = self.paths(source, target)
+        if not len(routes["pools"]):
+            return {"routes": [], "in": amount, "out": 0.0, "single": 0.0}
+        balances = self.balances.copy()
+        chunk = amount / steps
+        sold = np.zeros(len(routes["pools"]))
+        bought = np.zeros(len(routes["pools"]))
+        for _ in range(steps):
+            best = int(np.argmax(self.payout(routes, chunk, balances)))
+            sold[best] += chunk
+            bought[best] += self.trade(balances, routes, best, chunk)
+        used = [int(i) for i in np.argsort(-sold) if sold[i]]
+        return {
+            "routes": [
+                {
+                    "pools": [self.pools[p] for p in routes["pools"][i] if p >= 0],
+                    "path": self.describe(routes, i),
+                    "in": float(sold[i]),
+                    "out": float(bought[i]),
+                }
+                for i in used
+            ],
+            "in": amount,
+            "out": float(bought.sum()),
+            "single": float(self.simulate(routes, [amount])["out"].max()),
+        }
+
+    def describe(self, routes, route):
+        """
+        :return: the symbols along a route, "BTS > USD > HONEST.USD"
+        """
+        assets = [routes["source"]] + [
+            self.ends[pool, 1 - side]
+            for pool, side in zip(routes["pools"][route], routes["sides"][route])
+            if pool >= 0
+        ]
+        return " > ".join(self.symbols[i] for i in assets)
+
+    def asset(self, name):
+        """
+        :return: the asset id of a symbol or an id
+        """
+        if name in self.index:
+            return name
+        return self.assets[self.symbols.index(name)]
+
+
+def main():
+    """
+    print the best split of one order and the slippage grid of its best
+    single route, from the pools last cached by the mapper
+    """
+    amount, source, target = float(sys.argv[1]), sys.argv[2], sys.argv[3]
+    start = time.perf_counter()
+    router = Router(read_pools(), read_assets())
+    loaded = time.perf_counter()
+    source, target = router.asset(source), router.asset(target)
+    split = router.split(source, target, amount)
+    solved = time.perf_counter()
+    print(
+        f"loaded {len(router.pools)} pools in {loaded - start:.3f}s, "
+        f"routed in {solved - loaded:.3f}s\n"
+    )
+    if not split["routes"]:
+        print("no route")
+        return
+    for route in split["routes"]:
+        print(
+            f"{sigfig(route['in'])} -> {sigfig(route['out'])}  {route['path']}"
+            f"  {' '.join(route['pools'])}"
+        )
+    print(
+        f"\nsplit pays {sigfig(split['out'])}, "
+        f"the best single route {sigfig(split['single'])}\n"
+    )
+    routes = router.paths(source, target)
+    sizes = np.geomspace(amount / 10 ** (ROUTE_GRID - 1), amount, ROUTE_GRID)
+    grid = router.simulate(routes, sizes)
+    best = int(np.argmax(grid["out"][:, -1]))
+    print(f"{router.describe(routes, best)}\n")
+    print(f"{'in':>12} {'out':>12} {'price':>12} {'impact':>9} {'fees':>12}")
+    for idx, size in enumerate(sizes):
+        out = grid["out"][best, idx]
+        print(
+            f"{sigfig(size):>12} {sigfig(out):>12} {sigfig(size / (out + NIL)):>12}"
+            f" {grid['impact'][best, idx]:>9.2%} {sigfig(grid['fee_cost'][best, idx]):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,55 +8,285 @@ LIQUIDITY POOL MAPPER
 """
 
 # STANDARD PYTHON MODULES
+import asyncio
+import itertools
 import time
+from collections import defaultdict, deque
 from json import dumps as json_dumps
 from json import loads as json_loads
 
 # THIRD PARTY MODULES
-from websocket import create_connection as wss
+import websockets
 
 # LIQUIDITY POOL MAPPER MODULES
-from config import NODES
+from config import (
+    BATCH_BYTES,
+    BATCH_MAX,
+    BATCH_RETRIES,
+    BATCH_START,
+    INFLIGHT,
+)
+from metrics import METRICS
+from replay import ARCHIVE
+from utilities import instance
 
+# missing ids in a row past the last object before a dense scan stops
+PROBE_GAP = 10
+# unique JSON-RPC request ids across every connection
+REQUEST_IDS = itertools.count(1)
 
-def wss_handshake():
+
+class RPCError(Exception):
     """
-    Create a websocket handshake
+    the node answered a request with an error instead of a result
     """
-    while True:
-        nodes = NODES[::]
-        nodes.append(nodes.pop(0))
-        node = nodes[0]
-        start = time.time()
-        rpc = wss(node, timeout=3)
-        if time.time() - start < 3:
-            break
-    return rpc
 
 
-def wss_query(rpc, params):
+# words of the errors a node answers a batch too large for it with
+REFUSALS = ("greater than", "exceeds", "too many", "too large")
+
+
+def refused(error):
+    """
+    :return: True when an RPCError is a node refusing a batch for its size
+    """
+    return any(word in str(error).lower() for word in REFUSALS)
+
+
+class AsyncRPC:
+    """
+    Pipelined asyncio JSON-RPC client
+
+    keeps many requests in flight on a single websocket;
+    a reader task matches each response to its request by unique id
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.wss = None
+        self.reader = None
+        self.pending = {}
+        self.inflight = asyncio.Semaphore(INFLIGHT)
+        # subscription notices carry no request id, None marks a closed socket
+        self.notices = asyncio.Queue()
+
+    async def connect(self, timeout=3):
+        """
+        open the websocket and start the response reader
+        """
+        if ARCHIVE.replaying:
+            # query answers from the archive, no socket and no reader
+            return self
+        self.wss = await websockets.connect(
+            self.node, open_timeout=timeout, max_size=None, ping_interval=None
+        )
+        self.reader = asyncio.create_task(self.read())
+        return self
+
+    async def close(self):
+        """
+        close the websocket, the reader fails any outstanding requests
+        """
+        if self.wss is not None:
+            await self.wss.close()
+        if self.reader is not None:
+            await asyncio.gather(self.reader, return_exceptions=True)
+        else:
+            # a replayed connection has no reader to end its notices
+            self.notices.put_nowait(None)
+
+    async def read(self):
+        """
+        resolve the pending future that matches each incoming response id
+        """
+        try:
+            async for message in self.wss:
+                ret = json_loads(message)
+                if ret.get("method") == "notice":
+                    self.notices.put_nowait(ret["params"])
+                    continue
+                future = self.pending.pop(ret.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result((ret, len(message)))
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"{self.node} closed"))
+            self.pending.clear()
+            self.notices.put_nowait(None)
+
+    async def query(self, params, node=None, sized=False):
+        """
+        send a request and await the response with the matching id
+        :param sized: also return the bytes of the response on the wire
+        :return: the result, or (result, bytes) when sized
+        """
+        del node  # a single connection always answers on its own node
+        if ARCHIVE.replaying:
+            ret = ARCHIVE.respond(params)
+            if "result" not in ret:
+                raise RPCError(ret["error"])
+            # offline, so measuring the answer again costs nothing that matters
+            return (ret["result"], len(json_dumps(ret))) if sized else ret["result"]
+        async with self.inflight:
+            request_id = next(REQUEST_IDS)
+            future = asyncio.get_running_loop().create_future()
+            self.pending[request_id] = future
+            # once the reader has ended nothing would resolve the future
+            if self.reader is None or self.reader.done():
+                self.pending.pop(request_id, None)
+                raise ConnectionError(f"{self.node} closed")
+            query = json_dumps(
+                {"method": "call", "params": params, "jsonrpc": "2.0", "id": request_id}
+            )
+            start = time.perf_counter()
+            try:
+                await self.wss.send(query)
+                ret, size = await future
+            except websockets.ConnectionClosed as error:
+                raise ConnectionError(f"{self.node} closed") from error
+            finally:
+                self.pending.pop(request_id, None)
+                # the reader may fail the future while send is still cut short
+                if future.done() and not future.cancelled():
+                    future.exception()
+        METRICS.record_rpc(
+            params[1],
+            self.node,
+            time.perf_counter() - start,
+            len(query),
+            size,
+            "result" not in ret,
+        )
+        ARCHIVE.record(params, ret)
+        if "result" not in ret:
+            raise RPCError(ret.get("error", ret))
+        return (ret["result"], size) if sized else ret["result"]
+
+
+class BatchSizer:
+    """
+    learn the largest get_objects style batch one node accepts
+
+    the size doubles after each full batch until a node first rejects one,
+    then grows by a quarter; it stays below the smallest rejected size
+    until REGROW batches in a row are accepted, which lifts that ceiling
+    by a quarter, and shrinks so the expected response stays under BATCH_BYTES
+    """
+
+    REGROW = 8
+
+    def __init__(self):
+        self.size = BATCH_START
+        self.ceiling = BATCH_MAX + 1
+        self.item_bytes = 0
+        self.streak = 0
+
+    def accept(self, count, nbytes):
+        """
+        a batch of count objects returned nbytes of json
+        """
+        per_item = nbytes / count
+        self.item_bytes = (
+            (self.item_bytes + per_item) / 2 if self.item_bytes else per_item
+        )
+        self.streak += 1
+        if self.streak % self.REGROW == 0 and self.ceiling <= BATCH_MAX:
+            self.ceiling = min(BATCH_MAX + 1, self.ceiling + max(1, self.ceiling // 4))
+        if count >= self.size:
+            step = self.size if self.ceiling > BATCH_MAX else max(1, self.size // 4)
+            self.size = min(self.size + step, self.ceiling - 1)
+        self.size = max(1, min(self.size, int(BATCH_BYTES / self.item_bytes)))
+
+    def reject(self, count):
+        """
+        a batch of count objects was refused for its size
+        """
+        self.streak = 0
+        self.ceiling = min(self.ceiling, count)
+        self.size = max(1, min(self.size, count // 2))
+
+
+# learned batch sizes by node url
+SIZERS = defaultdict(BatchSizer)
+
+
+async def astream_batches(rpc, method, ids, *args):
     """
-    Send and receive websocket requests
+    the one batching layer for get_objects style calls over a list of ids
+
+    each batch is sized for the node that will serve it, batches run
+    concurrently, a batch refused for its size is halved and queued again,
+    and one that failed otherwise is queued again after a backoff, until
+    BATCH_RETRIES failures in all
+    :yield: (batch ids, results) for each batch as soon as it returns
     """
-    query = json_dumps({"method": "call", "params": params, "jsonrpc": "2.0", "id": 1})
-    rpc.send(query)
-    ret = json_loads(rpc.recv())
+    if not ids:
+        return
+    pending = deque([(list(ids), 0)])
+    landed = asyncio.Queue()
+    failures = [0]
+
+    async def worker():
+        while pending:
+            todo, attempts = pending.popleft()
+            # a NodePool chooses its node up front, a single AsyncRPC is its node
+            node = await rpc.pick() if hasattr(rpc, "pick") else rpc.node
+            sizer = SIZERS[node]
+            if len(todo) > sizer.size:
+                pending.appendleft((todo[sizer.size :], attempts))
+                todo = todo[: sizer.size]
+            try:
+                ret, size = await rpc.query(
+                    ["database", method, [todo, *args]], node=node, sized=True
+                )
+            except RPCError as error:
+                if refused(error) and len(todo) > 1:
+                    sizer.reject(len(todo))
+                    pending.appendleft((todo, attempts))
+                    continue
+                failures[0] += 1
+                if failures[0] > BATCH_RETRIES:
+                    raise
+                await asyncio.sleep(0.1 * 2 ** min(attempts, 5))
+                pending.append((todo, attempts + 1))
+                continue
+            sizer.accept(len(todo), size)
+            landed.put_nowait((todo, ret))
+
+    workers = asyncio.ensure_future(
+        asyncio.gather(*(worker() for _ in range(INFLIGHT)))
+    )
+    # the sentinel follows the last batch, or the first failure
+    workers.add_done_callback(lambda _: landed.put_nowait(None))
     try:
-        ret = ret["result"]  # if there is result key take it
-    except Exception:
-        print(ret)
-    return ret
+        while (item := await landed.get()) is not None:
+            yield item
+        await workers
+    finally:
+        workers.cancel()
+
+
+async def abatched(rpc, method, ids, *args):
+    """
+    astream_batches collected once every batch has returned
+    :return: the results in the order of ids
+    """
+    found = {}
+    async for todo, ret in astream_batches(rpc, method, ids, *args):
+        found.update(zip(todo, ret))
+    return [found[i] for i in ids]
 
 
-def rpc_get_objects(rpc, object_ids):
+async def arpc_get_objects(rpc, object_ids):
     """
     Return data about objects in 1.7.x, 2.4.x, 1.3.x, etc. format
     """
-    ret = wss_query(rpc, ["database", "get_objects", [object_ids]])
+    ret = await abatched(rpc, "get_objects", object_ids)
     return {object_ids[idx]: item for idx, item in enumerate(ret) if item is not None}
 
 
-def rpc_ticker(rpc, pair):
+async def arpc_ticker(rpc, pair):
     """
     RPC the latest ticker price
     ~
@@ -65,16 +295,33 @@ def rpc_ticker(rpc, pair):
     :RPC returns: The market ticker for the past 24 hours
     """
     asset, currency = pair.split(":")
-    ticker = wss_query(rpc, ["database", "get_ticker", [currency, asset, False]])
+    ticker = await rpc.query(["database", "get_ticker", [currency, asset, False]])
     return float(ticker["latest"])
 
 
-def get_max_object(rpc, space):
+async def aget_max_object(rpc, space, start=None, batch=BATCH_START):
     """
     get the maximum object id within this instance space
-    using a modified exponential search
-    allow for missing values
+    using a modified exponential search, allowing for missing values;
+    the probes depend on each other so run in series
+
+    given the last known max as start, probe forward from it in dense
+    batches instead, which costs one call when fewer than batch are new
     """
+    if start is not None:
+        max_object = start
+        while True:
+            last = max_object + batch
+            ids = [f"{space}{i}" for i in range(max_object + 1, last + 1)]
+            objects = [
+                instance(v["id"])
+                for v in (await arpc_get_objects(rpc, ids)).values()
+            ]
+            max_object = max(objects, default=max_object)
+            # a deleted object leaves a hole, so only a longer run of missing
+            # ids at the end of the batch means there is nothing beyond it
+            if last - max_object > PROBE_GAP:
+                return max_object
     power = 5
     max_object = 0
     objects = []
@@ -82,8 +329,8 @@ def get_max_object(rpc, space):
         ids = [f"{space}{int(max_object + i ** power)}" for i in range(1, 777)]
         try:
             objects = [
-                int(v["id"].split(".")[2])
-                for v in rpc_get_objects(rpc, ids).values()
+                instance(v["id"])
+                for v in (await arpc_get_objects(rpc, ids)).values()
                 if v is not None
             ]
             max_object = max(objects)
@@ -96,36 +343,30 @@ def get_max_object(rpc, space):
     return max_object
 
 
-def get_liquidity_pool_volume(rpc, pools):
+async def asubscribe(rpc, object_ids, callback=0):
     """
-    get the sum amount a volume for a given set of liquidity pools
+    have one AsyncRPC connection push every later change to these objects
+    ~
+    :RPC param callback: echoed back as the first param of each notice
+    :RPC param notify_remove_create: False, only changes to watched objects
+    :return: the current objects, as arpc_get_objects
     """
-    return {
-        i["id"]: int(i["statistics"]["_24h_exchange_a2b_amount_a"])
-        + int(i["statistics"]["_24h_exchange_b2a_amount_a"])
-        for i in wss_query(
-            rpc, ["database", "get_liquidity_pools", [pools, False, True]]
-        )
-    }
+    await rpc.query(["database", "set_subscribe_callback", [callback, False]])
+    # objects fetched after set_subscribe_callback are watched by the node
+    return await arpc_get_objects(rpc, object_ids)
 
 
-def rpc_get_feed(rpc, data_id):
+async def anotices(rpc, everything=False):
     """
-    return the oracle feed price for a given MPA
+    yield each changed object pushed to a subscribed AsyncRPC connection;
+    a notice is [callback, [[update, ...]]], its updates a list per call
+    :param everything: also yield the ids of removed objects and the
+        [operation, result] pairs of market notices
     """
-    # given the bitasset_data_id, get the median feed price
-    feed = rpc_get_objects(rpc, [data_id])[data_id]["median_feed"]["settlement_price"]
-    # calculate the base feed amount in human terms
-    base = int(feed["base"]["amount"])
-    base_asset_id = feed["base"]["asset_id"]
-    base_precision = int(
-        rpc_get_objects(rpc, [base_asset_id])[base_asset_id]["precision"]
-    )
-    # calculate the quote feed amount in human terms
-    quote = int(feed["quote"]["amount"])
-    quote_asset_id = feed["quote"]["asset_id"]
-    quote_precision = int(
-        rpc_get_objects(rpc, [quote_asset_id])[quote_asset_id]["precision"]
-    )
-    # convert fractional human price to floating point
-    return (base / 10**base_precision) / (quote / 10**quote_precision)
+    while (params := await rpc.notices.get()) is not None:
+        for group in params[1]:
+            for item in group:
+                # removed objects are notified by id alone
+                if everything or isinstance(item, dict):
+                    yield item
+    raise ConnectionError(f"{rpc.node} closed")
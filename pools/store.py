@@ -0,0 +1,431 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+SQLite cache store
+
+one database in the pipe folder replaces the whole-file json_ipc caches;
+rows are keyed by numeric object instance, every write is a single
+upsert transaction, and write-ahead logging lets concurrent readers
+proceed while a writer is busy
+
+to inspect the live cache in the terminal:
+
+    sqlite3 pipe/cache.db "SELECT * FROM pools"
+"""
+
+# STANDARD PYTHON MODULES
+import os
+import sqlite3
+from contextlib import closing
+from json import dumps as json_dumps
+from json import loads as json_loads
+from os.path import exists
+
+# LIQUIDITY POOL MAPPER MODULES
+from tables import AssetTable, PoolTable
+from utilities import PATH, instance, json_ipc
+
+# GLOBAL CONSTANTS
+DATABASE = f"{PATH}/cache.db"
+# table: {column: sqlite type}, the first column is the primary key
+SCHEMA = {
+    "pools": {
+        "instance": "INTEGER PRIMARY KEY",
+        "asset_a": "INTEGER NOT NULL",
+        "asset_b": "INTEGER NOT NULL",
+        "balance_a": "INTEGER NOT NULL",
+        "balance_b": "INTEGER NOT NULL",
+        "share_asset": "INTEGER NOT NULL",
+        "share_supply": "INTEGER",
+        "volume": "INTEGER",
+        # taker fee in hundredths of a percent, 10000 is 100%
+        "taker_fee": "INTEGER",
+    },
+    "assets": {
+        "instance": "INTEGER PRIMARY KEY",
+        "symbol": "TEXT NOT NULL",
+        "precision": "INTEGER NOT NULL",
+        "issuer": "INTEGER",
+    },
+    "share_assets": {
+        "instance": "INTEGER PRIMARY KEY",
+        "symbol": "TEXT NOT NULL",
+        "precision": "INTEGER NOT NULL",
+    },
+    "tickers": {
+        "instance": "INTEGER PRIMARY KEY",
+        "price": "REAL NOT NULL",
+        "time": "REAL NOT NULL",
+    },
+    # median feed by asset instance, a NULL bitasset for assets that are not MPAs
+    "feeds": {
+        "instance": "INTEGER PRIMARY KEY",
+        "bitasset": "INTEGER",
+        "backing": "INTEGER",
+        "price": "REAL",
+        "time": "REAL NOT NULL",
+    },
+    # high-water mark: the largest known instance in each object space
+    "marks": {
+        "space": "TEXT PRIMARY KEY",
+        "instance": "INTEGER NOT NULL",
+    },
+    "accounts": {
+        "instance": "INTEGER PRIMARY KEY",
+        "name": "TEXT NOT NULL",
+    },
+    # transfer totals by "sender:receiver:asset" account and asset instances
+    "flows": {
+        "flow": "TEXT PRIMARY KEY",
+        "sender": "INTEGER NOT NULL",
+        "receiver": "INTEGER NOT NULL",
+        "asset": "INTEGER NOT NULL",
+        "amount": "INTEGER NOT NULL",
+        "count": "INTEGER NOT NULL",
+    },
+    # precomputed node positions as json, keyed by a hash of the graph topology
+    "layouts": {
+        "topology": "TEXT PRIMARY KEY",
+        "positions": "TEXT NOT NULL",
+    },
+}
+INDEXES = {
+    "pools_asset_a": ("pools", "asset_a"),
+    "pools_asset_b": ("pools", "asset_b"),
+    "pools_share_asset": ("pools", "share_asset"),
+}
+# database paths whose schema this process has already set up
+READY = set()
+# legacy json_ipc pipe files and the table each one migrates into
+LEGACY = {
+    "pool_cache.txt": "pools",
+    "name_cache.txt": "assets",
+    "named_share_cache.txt": "share_assets",
+    "ticker_cache.txt": "tickers",
+    # id_cache and share_cache are derived from the pools table
+    "id_cache.txt": None,
+    "share_cache.txt": None,
+}
+
+
+def connect():
+    """
+    open the cache database, creating the schema on its first use this process
+    """
+    os.makedirs(PATH, exist_ok=True)
+    # a cleared cache deletes the file, so a missing one is set up again
+    fresh = DATABASE not in READY or not exists(DATABASE)
+    conn = sqlite3.connect(DATABASE, timeout=30)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if fresh:
+        setup(conn)
+        READY.add(DATABASE)
+    return conn
+
+
+def setup(conn):
+    """
+    switch the database to write-ahead logging, which persists in the file,
+    and create or extend every table and index in the SCHEMA
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        for table, columns in SCHEMA.items():
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                + ", ".join(f'"{col}" {kind}' for col, kind in columns.items())
+                + ")"
+            )
+            # add any column introduced since the database was created
+            known = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for col, kind in columns.items():
+                if col not in known:
+                    conn.execute(
+                        f'ALTER TABLE {table} ADD COLUMN "{col}" '
+                        + kind.replace(" NOT NULL", "")
+                    )
+        for index, (table, col) in INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ("{col}")')
+
+
+def upsert(table, rows):
+    """
+    insert or update {instance: {column: value}} rows in one transaction
+    """
+    if not rows:
+        return
+    columns = list(SCHEMA[table])
+    key = columns[0]
+    # a column left out of the new row keeps its stored value
+    updates = ", ".join(
+        f'"{col}"=COALESCE(excluded."{col}", {table}."{col}")' for col in columns[1:]
+    )
+    query = (
+        f"INSERT INTO {table} ("
+        + ", ".join(f'"{col}"' for col in columns)
+        + f") VALUES ({', '.join('?' * len(columns))})"
+        + f' ON CONFLICT("{key}") DO UPDATE SET {updates}'
+    )
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            query,
+            [
+                (key, *(row.get(col) for col in columns[1:]))
+                for key, row in rows.items()
+            ],
+        )
+
+
+def update(table, rows):
+    """
+    set only the given columns of existing {instance: {column: value}} rows
+    """
+    if not rows:
+        return
+    columns = list(next(iter(rows.values())))
+    query = (
+        f"UPDATE {table} SET "
+        + ", ".join(f'"{col}"=?' for col in columns)
+        + f' WHERE "{list(SCHEMA[table])[0]}"=?'
+    )
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            query, [(*(row[col] for col in columns), key) for key, row in rows.items()]
+        )
+
+
+def select(table):
+    """
+    :return: {instance: {column: value}} for every row in the table
+    """
+    with closing(connect()) as conn:
+        cursor = conn.execute(f"SELECT * FROM {table} ORDER BY 1")
+        columns = [col[0] for col in cursor.description]
+        return {row[0]: dict(zip(columns[1:], row[1:])) for row in cursor}
+
+
+def write_pools(pool_cache):
+    """
+    upsert {"1.19.x": {"asset_a": "1.3.x", ...}} pools
+    """
+    upsert(
+        "pools",
+        {
+            instance(pool): {
+                **item,
+                "asset_a": instance(item["asset_a"]),
+                "asset_b": instance(item["asset_b"]),
+                "share_asset": instance(item["share_asset"]),
+            }
+            for pool, item in pool_cache.items()
+        },
+    )
+
+
+def update_pools(changes):
+    """
+    update some columns of known {"1.19.x": {column: value}} pools
+    """
+    update("pools", {instance(pool): row for pool, row in changes.items()})
+
+
+def read_pools():
+    """
+    :return: the pool_cache as a PoolTable of {"1.19.x": {"asset_a": "1.3.x", ...}}
+    """
+    return PoolTable.from_rows(select("pools"))
+
+
+def write_assets(name_cache, table="assets"):
+    """
+    upsert {"1.3.x": {"symbol": str, "precision": int, "issuer": "1.2.y"}}
+    into assets or share_assets, which keeps no issuer
+    """
+    upsert(
+        table,
+        {
+            instance(key): {
+                **value,
+                "issuer": instance(value["issuer"]) if value.get("issuer") else None,
+            }
+            for key, value in name_cache.items()
+        },
+    )
+
+
+def read_assets(table="assets"):
+    """
+    :return: the name_cache, or named_share_cache, as an AssetTable of
+        {"1.3.x": {"symbol", "precision", "issuer"}}
+    """
+    return AssetTable.from_rows(select(table))
+
+
+def write_tickers(ticker_cache):
+    """
+    upsert {"1.3.x": {"price": float, "time": float}} tickers
+    """
+    upsert("tickers", {instance(key): value for key, value in ticker_cache.items()})
+
+
+def read_tickers():
+    """
+    :return: the ticker_cache as {"1.3.x": {"price": float, "time": float}}
+    """
+    return {f"1.3.{key}": row for key, row in select("tickers").items()}
+
+
+def write_feeds(feed_cache):
+    """
+    upsert {"1.3.x": {"bitasset": "2.4.y", "backing": "1.3.z", ...}} feeds
+    """
+    upsert(
+        "feeds",
+        {
+            instance(key): {
+                **row,
+                "bitasset": None if row["bitasset"] is None else instance(row["bitasset"]),
+                "backing": None if row["backing"] is None else instance(row["backing"]),
+            }
+            for key, row in feed_cache.items()
+        },
+    )
+
+
+def read_feeds():
+    """
+    :return: the feed_cache as {"1.3.x": {"bitasset": "2.4.y" or None,
+        "backing": "1.3.z" or None, "price": float or None, "time": float}}
+    """
+    return {
+        f"1.3.{key}": {
+            **row,
+            "bitasset": None if row["bitasset"] is None else f"2.4.{row['bitasset']}",
+            "backing": None if row["backing"] is None else f"1.3.{row['backing']}",
+        }
+        for key, row in select("feeds").items()
+    }
+
+
+def read_mark(space):
+    """
+    :return: the high-water mark instance for an object space such as "1.19.",
+        None if the space has never been scanned
+    """
+    with closing(connect()) as conn:
+        row = conn.execute(
+            "SELECT instance FROM marks WHERE space=?", (space,)
+        ).fetchone()
+        if row is None and space == "1.19.":
+            # caches migrated from json_ipc have pools but no mark yet
+            row = conn.execute("SELECT MAX(instance) FROM pools").fetchone()
+    return None if row is None else row[0]
+
+
+def write_mark(space, mark):
+    """
+    persist the high-water mark instance for an object space
+    """
+    upsert("marks", {space: {"instance": mark}})
+
+
+def add_flows(flows, block):
+    """
+    add {("1.2.x", "1.2.y", "1.3.z"): [amount, count]} transfer totals and
+    move the "blocks" mark to the last block they cover, in one transaction
+    so a crash never counts a block twice or skips one
+    """
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO flows VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(flow) DO UPDATE"
+            " SET amount=amount+excluded.amount, count=count+excluded.count",
+            [
+                (
+                    ":".join(str(instance(i)) for i in key),
+                    *(instance(i) for i in key),
+                    amount,
+                    count,
+                )
+                for key, (amount, count) in flows.items()
+            ],
+        )
+        conn.execute(
+            "INSERT INTO marks VALUES ('blocks', ?) ON CONFLICT(space) DO UPDATE"
+            " SET instance=excluded.instance",
+            (block,),
+        )
+
+
+def read_flows():
+    """
+    :return: {("1.2.x", "1.2.y", "1.3.z"): [amount, count]} transfer totals
+    """
+    return {
+        (f"1.2.{row['sender']}", f"1.2.{row['receiver']}", f"1.3.{row['asset']}"): [
+            row["amount"],
+            row["count"],
+        ]
+        for row in select("flows").values()
+    }
+
+
+def write_accounts(names):
+    """
+    upsert {"1.2.x": name} account names
+    """
+    upsert("accounts", {instance(key): {"name": name} for key, name in names.items()})
+
+
+def read_accounts():
+    """
+    :return: {"1.2.x": name} for every known account
+    """
+    return {f"1.2.{key}": row["name"] for key, row in select("accounts").items()}
+
+
+def read_layout(topology):
+    """
+    :return: the cached {node: [x, y]} positions for a topology hash, or None
+    """
+    with closing(connect()) as conn:
+        row = conn.execute(
+            "SELECT positions FROM layouts WHERE topology=?", (topology,)
+        ).fetchone()
+    return None if row is None else json_loads(row[0])
+
+
+def write_layout(topology, positions):
+    """
+    cache the {node: [x, y]} positions computed for a topology hash
+    """
+    upsert("layouts", {topology: {"positions": json_dumps(positions)}})
+
+
+def migrate():
+    """
+    import the legacy pipe/*.txt json_ipc caches into the database once,
+    then rename them *.migrated so they are kept but never read again
+    """
+    writers = {
+        "pools": write_pools,
+        "assets": write_assets,
+        "share_assets": lambda data: write_assets(data, "share_assets"),
+        "tickers": lambda data: write_tickers(
+            {
+                key: value if isinstance(value, dict) else {"price": value, "time": 0}
+                for key, value in data.items()
+            }
+        ),
+    }
+    for filename, table in LEGACY.items():
+        filepath = f"{PATH}/{filename}"
+        if not exists(filepath):
+            continue
+        if table is not None:
+            print(f"migrating {filename} into {DATABASE}...")
+            writers[table](json_ipc(filename))
+        os.replace(filepath, f"{filepath}.migrated")
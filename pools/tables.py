@@ -0,0 +1,208 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Compact pool and asset tables
+
+rows live in typed arrays keyed by integer object instance, with one
+dict from instance to row number; string ids such as "1.19.43" are only
+parsed or built at the edges, so a table reads like the familiar
+{"1.19.x": {...}} cache dict while holding a few machine words per row
+"""
+
+# STANDARD PYTHON MODULES
+from array import array
+
+# LIQUIDITY POOL MAPPER MODULES
+from utilities import instance
+
+# stands in for a NULL share_supply or volume inside an integer array
+MISSING = -1
+
+
+class Table:
+    """
+    read-mostly mapping of "space.instance" ids to row dicts, stored by column
+
+    subclasses name their object space, their integer columns, and any
+    columns that hold other object ids, of the "1.3." space unless SPACES
+    names another
+    """
+
+    __slots__ = ("row", "instances", "columns")
+    SPACE = ""
+    INTEGERS = ()
+    OBJECTS = ()
+    TEXT = ()
+    NULLABLE = ()
+    SPACES = {}
+
+    def __init__(self):
+        self.row = {}
+        self.instances = array("q")
+        self.columns = {
+            **{col: array("q") for col in self.INTEGERS + self.OBJECTS},
+            **{col: [] for col in self.TEXT},
+        }
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        build a table from {instance: {column: value}} rows as stored
+        """
+        table = cls()
+        table.update_rows(rows)
+        return table
+
+    @classmethod
+    def from_cache(cls, cache):
+        """
+        build a table from a {"space.x": {column: value}} cache dict
+        """
+        table = cls()
+        table.update(cache)
+        return table
+
+    def update_rows(self, rows):
+        """
+        insert or overwrite {instance: {column: value}} rows
+        """
+        for key, item in rows.items():
+            idx = self.row.get(key)
+            if idx is None:
+                idx = self.row[key] = len(self.instances)
+                self.instances.append(key)
+                for col, values in self.columns.items():
+                    values.append(MISSING if col not in self.TEXT else "")
+            # a column left out of the row keeps its current value
+            for col, value in item.items():
+                if col in self.columns:
+                    self.columns[col][idx] = MISSING if value is None else value
+
+    def update(self, cache):
+        """
+        insert or overwrite {"space.x": {column: value}} entries
+        """
+        self.update_rows(
+            {
+                instance(key): {
+                    col: instance(value)
+                    if col in self.OBJECTS and value is not None
+                    else value
+                    for col, value in item.items()
+                }
+                for key, item in cache.items()
+            }
+        )
+
+    def to_cache(self):
+        """
+        :return: the whole table as a {"space.x": {column: value}} dict
+        """
+        return dict(self.items())
+
+    def key(self, idx):
+        """
+        the "space.x" id of a row number
+        """
+        return f"{self.SPACE}{self.instances[idx]}"
+
+    def entry(self, idx):
+        """
+        one row in cache format
+        """
+        ret = {}
+        for col, values in self.columns.items():
+            value = values[idx]
+            if col in self.NULLABLE and value == MISSING:
+                value = None
+            elif col in self.OBJECTS:
+                value = f"{self.SPACES.get(col, '1.3.')}{value}"
+            ret[col] = value
+        return ret
+
+    def find(self, key):
+        """
+        the row number of a "space.x" id or integer instance, None when
+        absent or when the id belongs to another object space
+
+        >>> pools = PoolTable.from_cache({"1.19.43": {"balance_a": 1}})
+        >>> "1.19.43" in pools, "1.3.43" in pools, "2.1.43" in pools
+        (True, False, False)
+        >>> pools.get("1.7.43") is None
+        True
+        """
+        if isinstance(key, int):
+            return self.row.get(key)
+        space, _, number = key.rpartition(".")
+        return self.row.get(int(number)) if f"{space}." == self.SPACE else None
+
+    def get(self, key, default=None):
+        """
+        dict.get by "space.x" id or integer instance
+        """
+        idx = self.find(key)
+        return default if idx is None else self.entry(idx)
+
+    def __getitem__(self, key):
+        ret = self.get(key)
+        if ret is None:
+            raise KeyError(key)
+        return ret
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def __len__(self):
+        return len(self.instances)
+
+    def __iter__(self):
+        return (self.key(idx) for idx in range(len(self.instances)))
+
+    def keys(self):
+        """
+        the "space.x" ids in insertion order
+        """
+        return list(self)
+
+    def values(self):
+        """
+        every row in cache format
+        """
+        return [self.entry(idx) for idx in range(len(self.instances))]
+
+    def items(self):
+        """
+        ("space.x", row) pairs
+        """
+        return [(self.key(idx), self.entry(idx)) for idx in range(len(self.instances))]
+
+
+class PoolTable(Table):
+    """
+    liquidity pools 1.19.x, with their assets as integer 1.3.x instances
+    """
+
+    __slots__ = ()
+    SPACE = "1.19."
+    INTEGERS = ("balance_a", "balance_b", "share_supply", "volume", "taker_fee")
+    OBJECTS = ("asset_a", "asset_b", "share_asset")
+    NULLABLE = ("share_supply", "volume", "taker_fee")
+
+
+class AssetTable(Table):
+    """
+    asset 1.3.x symbols, precisions and issuer 1.2.x accounts
+    """
+
+    __slots__ = ()
+    SPACE = "1.3."
+    INTEGERS = ("precision",)
+    OBJECTS = ("issuer",)
+    TEXT = ("symbol",)
+    # assets cached before issuers were, and share assets, have no issuer
+    NULLABLE = ("issuer",)
+    SPACES = {"issuer": "1.2."}
@@ -0,0 +1,127 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Asset taxonomy
+
+the TAXONOMY groups in config are compiled once: every symbol rule into
+one regex of named alternatives in group order, issuer names and asset
+ids into dicts of group order; an asset falls in the first group any of
+its rules match, remembered by asset id, so the same groups color the
+map, DETACH assets from it and gather its leaf assets into clusters
+
+issuers are cached in the assets table beside each symbol, and their
+account names in the accounts table, so each is fetched once
+"""
+
+# STANDARD PYTHON MODULES
+import re
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import TAXONOMY
+from rpc import arpc_get_objects
+from store import read_accounts, write_accounts, write_assets
+from utilities import asset_entry
+
+# issuers are only fetched when some group has issuer rules
+ISSUER_RULES = any(i.get("issuers") for i in TAXONOMY)
+
+
+def symbol_pattern(group):
+    """
+    :return: one regex matching the whole of any symbol the group's symbol
+        rules accept, None when it has no symbol rules
+    """
+    parts = (
+        [re.escape(i) + ".*" for i in group.get("prefix", [])]
+        + [".*" + re.escape(i) for i in group.get("suffix", [])]
+        + [".*" + re.escape(i) + ".*" for i in group.get("contains", [])]
+        + [re.escape(i) for i in group.get("symbols", [])]
+        + ([group["pattern"]] if "pattern" in group else [])
+    )
+    return "|".join(f"(?:{i})" for i in parts) or None
+
+
+class Taxonomy:
+    """
+    a compiled set of asset groups
+
+    :param groups: [{"name", "color", and any rules}] in order of precedence
+    """
+
+    def __init__(self, groups=TAXONOMY):
+        self.names = [i["name"] for i in groups]
+        self.colors = {i["name"]: i["color"] for i in groups}
+        # an asset or issuer listed twice belongs to the first group naming it
+        self.assets, self.issuers = {}, {}
+        for idx, group in enumerate(groups):
+            for asset in group.get("assets", []):
+                self.assets.setdefault(asset, idx)
+            for issuer in group.get("issuers", []):
+                self.issuers.setdefault(issuer, idx)
+        patterns = {f"g{idx}": symbol_pattern(i) for idx, i in enumerate(groups)}
+        # alternatives are tried in order, so the first group to match wins
+        self.symbols = re.compile(
+            "|".join(f"(?P<{k}>{v})" for k, v in patterns.items() if v is not None)
+            or "(?!)",
+            re.DOTALL,
+        )
+        self.memo = {}
+
+    def classify(self, asset, symbol, issuer=None):
+        """
+        :param issuer: the issuer account name, if known
+        :return: the name of the first group matching an asset
+        """
+        group = self.memo.get(asset)
+        if group is None:
+            last = len(self.names) - 1
+            found = [self.assets.get(asset, last), self.issuers.get(issuer, last)]
+            match = self.symbols.fullmatch(symbol)
+            if match:
+                found.append(int(match.lastgroup[1:]))
+            # an asset no rule matches joins the last group
+            group = self.memo[asset] = self.names[min(found)]
+        return group
+
+    def classify_all(self, name_cache, accounts=None):
+        """
+        :param accounts: {"1.2.x": name} of the issuers, for issuer rules
+        :return: {asset_id: group name} for every asset in the name_cache
+        """
+        accounts = accounts or {}
+        return {
+            asset: self.classify(
+                asset, entry["symbol"], accounts.get(entry.get("issuer"))
+            )
+            for asset, entry in name_cache.items()
+        }
+
+
+async def refresh_issuers(rpc, name_cache):
+    """
+    when any group has issuer rules, fetch the issuer of every asset cached
+    before issuers were, then the names of the new issuers, one batch each
+    :return: {"1.2.x": name} of every known account
+    """
+    accounts = read_accounts()
+    if not ISSUER_RULES:
+        return accounts
+    unknown = sorted(k for k, v in name_cache.items() if v.get("issuer") is None)
+    found = {
+        k: asset_entry(v) for k, v in (await arpc_get_objects(rpc, unknown)).items()
+    }
+    name_cache.update(found)
+    write_assets(found)
+    issuers = {v["issuer"] for v in name_cache.values()} - {None}
+    found = await arpc_get_objects(rpc, sorted(i for i in issuers if i not in accounts))
+    names = {k: v["name"] for k, v in found.items()}
+    accounts.update(names)
+    write_accounts(names)
+    return accounts
+
+
+GROUPS = Taxonomy()
@@ -0,0 +1,101 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+"""
+
+# STANDARD PYTHON MODULES
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import TICKER_TTL
+from metrics import METRICS
+from rpc import arpc_ticker
+from utilities import dprint
+
+
+def stale_tickers(ticker_cache, asset_ids, ttl=TICKER_TTL, now=None):
+    """
+    asset ids whose ticker is missing or older than ttl seconds
+    entries from before timestamps were stored count as expired
+    """
+    now = now or time.time()
+    return sorted(
+        {
+            asset_id
+            for asset_id in asset_ids
+            if asset_id != "1.3.0"
+            and (
+                not isinstance(ticker_cache.get(asset_id), dict)
+                or now - ticker_cache[asset_id]["time"] > ttl
+            )
+        }
+    )
+
+
+async def refresh_tickers(rpc, ticker_cache, asset_ids, ttl=TICKER_TTL):
+    """
+    fetch every missing or expired 1.3.0:<asset> ticker as one concurrent batch
+    :return: the updated ticker_cache of {asset_id: {"price": float, "time": float}}
+    """
+    stale = stale_tickers(ticker_cache, asset_ids, ttl)
+    METRICS.cache("tickers", len(set(asset_ids)) - len(stale), len(stale))
+    dprint("\nstale tickers", stale)
+    prices = await asyncio.gather(
+        *(arpc_ticker(rpc, f"1.3.0:{asset_id}") for asset_id in stale)
+    )
+    now = time.time()
+    ticker_cache.update(
+        {asset_id: {"price": price, "time": now} for asset_id, price in zip(stale, prices)}
+    )
+    ticker_cache["1.3.0"] = {"price": 1, "time": now}
+    return ticker_cache
+
+
+def pool_prices(pool_cache, name_cache):
+    """
+    value every asset reachable from BTS through the pools, in the get_ticker
+    convention of asset units per BTS; each asset is priced along the path
+    whose shallowest pool holds the most BTS value, a widest path Dijkstra
+    :return: {asset_id: price} for every reachable asset
+    """
+    graph = defaultdict(list)
+    for item in pool_cache.values():
+        asset_a, asset_b = item["asset_a"], item["asset_b"]
+        # an empty side carries no price
+        if not (item["balance_a"] and item["balance_b"]):
+            continue
+        human_a = item["balance_a"] / 10 ** name_cache[asset_a]["precision"]
+        human_b = item["balance_b"] / 10 ** name_cache[asset_b]["precision"]
+        graph[asset_a].append((asset_b, human_a, human_b))
+        graph[asset_b].append((asset_a, human_b, human_a))
+    prices, depths, done = {"1.3.0": 1.0}, {"1.3.0": float("inf")}, set()
+    heap = [(-depths["1.3.0"], "1.3.0")]
+    while heap:
+        _, asset = heapq.heappop(heap)
+        if asset in done:
+            continue
+        done.add(asset)
+        for other, mine, theirs in graph[asset]:
+            # the BTS value of this pool's side is its depth
+            depth = min(depths[asset], mine / prices[asset])
+            if other not in done and depth > depths.get(other, 0):
+                depths[other] = depth
+                prices[other] = prices[asset] * theirs / mine
+                heapq.heappush(heap, (-depth, other))
+    return prices
+
+
+def ticker_prices(ticker_cache):
+    """
+    flatten the timestamped ticker_cache to {asset_id: price}
+    """
+    return {
+        asset_id: entry["price"] if isinstance(entry, dict) else entry
+        for asset_id, entry in ticker_cache.items()
+    }
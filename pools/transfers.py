@@ -0,0 +1,249 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Transfers visualizer
+
+scans every irreversible block since the last checkpoint, TRANSFER_BLOCKS
+back on the first run, fetching each chunk of blocks concurrently across
+the warm nodes; the transfer operations of a chunk are added to the
+account to account flow totals in the cache database in the same
+transaction that moves the checkpoint, so a crash loses no progress and
+counts no block twice; the flows, valued in BTS through the ticker_cache,
+are mapped to transfers.html like the pool network
+
+    python3 transfers.py --blocks 28800
+"""
+
+# STANDARD PYTHON MODULES
+import argparse
+import asyncio
+import math
+import time
+
+# THIRD PARTY MODULES
+from pyvis.network import Network
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import (
+    BUTTONS,
+    COLOR,
+    DARK_THEME,
+    HEIGHT,
+    RETRIES,
+    TRANSFER_BLOCKS,
+    TRANSFER_CHUNK,
+    TRANSFER_EDGES,
+)
+from layout import cached_layout, export_graph
+from metrics import METRICS
+from nodes import NodePool
+from pool_mapper import init_pipe
+from rpc import arpc_get_objects
+from store import (
+    add_flows,
+    read_accounts,
+    read_assets,
+    read_flows,
+    read_mark,
+    read_tickers,
+    write_accounts,
+    write_assets,
+    write_tickers,
+)
+from tickers import refresh_tickers, ticker_prices
+from utilities import NIL, asset_entry, sigfig
+
+# operation id of a transfer
+TRANSFER = 0
+
+
+def block_transfers(block):
+    """
+    :return: (sender, receiver, asset, amount) of every transfer in a block
+    """
+    return [
+        (op["from"], op["to"], op["amount"]["asset_id"], int(op["amount"]["amount"]))
+        for trx in block["transactions"]
+        for kind, op in trx["operations"]
+        if kind == TRANSFER
+    ]
+
+
+async def fetch_block(rpc, num):
+    """
+    a node lagging behind the last irreversible block answers get_block
+    with null, so the warm nodes are asked in turn, starting from a
+    different one for each block
+    :return: the block
+    """
+    nodes = list(rpc.live) or [None]
+    turn = num % len(nodes)
+    for node in (nodes[turn:] + nodes[:turn])[:RETRIES]:
+        block = await rpc.query(["database", "get_block", [num]], node)
+        if block is not None:
+            return block
+    # the chunk fails before its flows are added, so the checkpoint stays put
+    raise ConnectionError(f"no warm node has block {num} yet")
+
+
+async def scan_blocks(rpc, blocks=TRANSFER_BLOCKS, chunk=TRANSFER_CHUNK):
+    """
+    add the transfers of every irreversible block since the checkpoint to
+    the flow totals, one chunk of concurrently fetched blocks at a time
+    :return: the number of blocks scanned
+    """
+    props = await rpc.query(["database", "get_dynamic_global_properties", []])
+    last = int(props["last_irreversible_block_num"])
+    mark = read_mark("blocks")
+    first = max(1, last - blocks + 1 if mark is None else mark + 1)
+    start = time.time()
+    for low in range(first, last + 1, chunk):
+        high = min(low + chunk - 1, last)
+        fetched = await asyncio.gather(
+            *(fetch_block(rpc, num) for num in range(low, high + 1))
+        )
+        flows = {}
+        for sender, receiver, asset, amount in (
+            i for block in fetched for i in block_transfers(block)
+        ):
+            flow = flows.setdefault((sender, receiver, asset), [0, 0])
+            flow[0] += amount
+            flow[1] += 1
+        add_flows(flows, high)
+        rate = (high - first + 1) / (time.time() - start + NIL)
+        print(
+            f"scanned blocks {first} to {high} of {last}, "
+            f"{rate:.0f} blocks per second"
+        )
+    return max(0, last - first + 1)
+
+
+async def name_flows(rpc, flows):
+    """
+    cache the names of the accounts and the assets, and refresh the BTS
+    tickers of the assets, found in the flows
+    :return: account names, name_cache, {asset: price in asset per BTS}
+    """
+    accounts = read_accounts()
+    missing = sorted({i for key in flows for i in key[:2]} - accounts.keys())
+    found = await arpc_get_objects(rpc, missing)
+    accounts.update({key: value["name"] for key, value in found.items()})
+    write_accounts({key: accounts[key] for key in found})
+    name_cache = read_assets()
+    assets = {key[2] for key in flows}
+    found = await arpc_get_objects(rpc, sorted(i for i in assets if i not in name_cache))
+    found = {k: asset_entry(v) for k, v in found.items()}
+    name_cache.update(found)
+    write_assets(found)
+    ticker_cache = read_tickers()
+    ticker_cache = await refresh_tickers(rpc, ticker_cache, sorted(assets))
+    write_tickers({k: ticker_cache[k] for k in assets | {"1.3.0"}})
+    return accounts, name_cache, ticker_prices(ticker_cache)
+
+
+def flow_edges(flows, name_cache, prices):
+    """
+    sum the flows between each pair of accounts in BTS terms
+    :return: {(sender, receiver): {"bts": float, "assets": {symbol: amount}}},
+        the TRANSFER_EDGES largest only
+    """
+    edges = {}
+    for (sender, receiver, asset), (amount, _) in flows.items():
+        human = amount / 10 ** name_cache[asset]["precision"]
+        edge = edges.setdefault((sender, receiver), {"bts": 0.0, "assets": {}})
+        # tickers are asset units per BTS, an asset that never traded is worth nothing
+        edge["bts"] += human / prices[asset] if prices.get(asset) else 0
+        symbol = name_cache[asset]["symbol"]
+        edge["assets"][symbol] = edge["assets"].get(symbol, 0) + human
+    largest = sorted(edges, key=lambda key: -edges[key]["bts"])[:TRANSFER_EDGES]
+    return {key: edges[key] for key in largest}
+
+
+def map_transfers(edges, accounts, show=True, output="transfers"):
+    """
+    build a pyvis network map of the account to account transfer flows
+    :return: None
+    """
+    nodes = sorted({i for key in edges for i in key})
+    sent = {i: 0.0 for i in nodes}
+    received = {i: 0.0 for i in nodes}
+    for (sender, receiver), edge in edges.items():
+        sent[sender] += edge["bts"]
+        received[receiver] += edge["bts"]
+    net = Network(
+        height=f"{HEIGHT}px",
+        width="100%",
+        bgcolor="#222222" if DARK_THEME else "#888888",
+        font_color="#888888" if DARK_THEME else "#222222",
+        select_menu=True,
+        directed=True,
+    )
+    positions = cached_layout(nodes, list(edges))
+    if nodes:
+        net.add_nodes(
+            nodes,
+            label=[accounts.get(i, i) for i in nodes],
+            color=[COLOR[0] if sent[i] >= received[i] else COLOR[3] for i in nodes],
+            size=[10 for _ in nodes],
+            title=[
+                f"{accounts.get(i, i)} {i}\n\nsent BTS: {sigfig(sent[i])}"
+                f"\nreceived BTS: {sigfig(received[i])}"
+                for i in nodes
+            ],
+            x=[positions[i][0] for i in nodes],
+            y=[positions[i][1] for i in nodes],
+        )
+    top = max((edge["bts"] for edge in edges.values()), default=0)
+    for (sender, receiver), edge in edges.items():
+        net.add_edge(
+            sender,
+            receiver,
+            value=math.log1p(edge["bts"]) / (math.log1p(top) + NIL) * 20 + 1,
+            title=f"BTS: {sigfig(edge['bts'])}\n\n"
+            + "\n".join(f"{k}: {sigfig(v)}" for k, v in sorted(edge["assets"].items())),
+        )
+    net.toggle_physics(False)
+    net.show_buttons(filter_=BUTTONS)
+    export_graph(net, f"{output}.json")
+    if show:
+        net.show(f"{output}.html")
+    else:
+        net.write_html(f"{output}.html")
+
+
+async def run(args):
+    """
+    scan from the checkpoint, then map every flow recorded so far
+    """
+    init_pipe()
+    rpc = await NodePool().connect()
+    try:
+        with METRICS.stage("scan", profile=False):
+            await scan_blocks(rpc, args.blocks, args.chunk)
+        flows = read_flows()
+        accounts, name_cache, prices = await name_flows(rpc, flows)
+    finally:
+        await rpc.close()
+    edges = flow_edges(flows, name_cache, prices)
+    print(f"mapping {len(edges)} of the largest flows")
+    map_transfers(edges, accounts, show=not args.no_show)
+    METRICS.write()
+
+
+def main():
+    """
+    parse the scan settings and run
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[-2])
+    parser.add_argument("--blocks", type=int, default=TRANSFER_BLOCKS)
+    parser.add_argument("--chunk", type=int, default=TRANSFER_CHUNK)
+    parser.add_argument("--no-show", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
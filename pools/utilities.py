@@ -62,11 +62,22 @@ def dprint(*args, **kwargs):
         print(*args, **kwargs)
 
 
-def chunks(list1, n_chunks):
+def instance(object_id):
     """
-    Yield n number of striped chunks from l
+    "1.19.43" -> 43
     """
-    return [list1[i + 1 :: n_chunks] for i in range(-1, n_chunks)]
+    return int(object_id.rsplit(".", 1)[-1])
+
+
+def asset_entry(asset):
+    """
+    the name_cache entry of an asset object
+    """
+    return {
+        "symbol": asset["symbol"],
+        "precision": asset["precision"],
+        "issuer": asset.get("issuer"),
+    }
 
 
 def json_ipc(doc="", text="", initialize=False, append=False):
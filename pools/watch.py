@@ -0,0 +1,94 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Live map updates
+
+a minimal server-sent events endpoint on localhost; the open map page
+listens on it and applies each pushed batch of edge changes to its vis.js
+edge DataSet in place, so nothing is re-rendered
+"""
+
+# STANDARD PYTHON MODULES
+import asyncio
+import contextlib
+from json import dumps as json_dumps
+
+# LIQUIDITY POOL MAPPER MODULES
+from config import WATCH_PORT
+
+
+class EventServer:
+    """
+    server-sent events to every open map page
+    """
+
+    def __init__(self, port=WATCH_PORT):
+        self.port = port
+        self.server = None
+        self.clients = set()
+
+    async def start(self):
+        """
+        listen on localhost only
+        """
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", self.port)
+        return self
+
+    async def close(self):
+        """
+        stop listening and hang up on every page
+        """
+        for writer in self.clients:
+            writer.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        """
+        answer any request with the one event stream, then hold it open
+        """
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            # the map is opened from a file:// url
+            b"Access-Control-Allow-Origin: *\r\n\r\n"
+        )
+        self.clients.add(writer)
+        try:
+            # returns once the page is closed
+            await reader.read()
+        finally:
+            self.clients.discard(writer)
+            with contextlib.suppress(Exception):
+                writer.close()
+
+    def push(self, data):
+        """
+        send json data as one event to every open page
+        """
+        message = f"data: {json_dumps(data)}\n\n".encode()
+        for writer in list(self.clients):
+            writer.write(message)
+
+
+def page_script(port=WATCH_PORT):
+    """
+    :return: html that applies each event to the pyvis edges DataSet by edge id
+    """
+    return (
+        "<script>"
+        f'new EventSource("http://127.0.0.1:{port}/events").onmessage = '
+        "(event) => edges.update(JSON.parse(event.data));"
+        "</script>"
+    )
@@ -0,0 +1,124 @@
+"""
+╔╗ ╦╔╦╗╔═╗╦ ╦╔═╗╦═╗╔═╗╔═╗  ╔╗╔╔═╗╔╦╗╦ ╦╔═╗╦═╗╦╔═╔═╗
+╠╩╗║ ║ ╚═╗╠═╣╠═╣╠╦╝║╣ ╚═╗  ║║║║╣  ║ ║║║║ ║╠╦╝╠╩╗╚═╗
+╚═╝╩ ╩ ╚═╝╩ ╩╩ ╩╩╚═╚═╝╚═╝  ╝╚╝╚═╝ ╩ ╚╩╝╚═╝╩╚═╩ ╩╚═╝
+
+LIQUIDITY POOL MAPPER
+
+Columnar weight engine
+
+pools are loaded once into numpy columns indexed by pool, with assets
+referenced by their index into a sorted asset id array; every weight,
+price and log scaling is then a handful of vector operations, so the
+whole pool set can be re-weighted with other prices at interactive speed
+"""
+
+# THIRD PARTY MODULES
+import numpy as np
+
+# LIQUIDITY POOL MAPPER MODULES
+from utilities import NIL
+
+
+def pool_columns(pool_cache, name_cache):
+    """
+    load {"1.19.x": {...}} pools into numpy columns
+    :return: {
+        "pools": pool ids, "assets": sorted asset ids,
+        "asset_a", "asset_b": asset indices per pool,
+        "balance_a", "balance_b", "volume": raw integer amounts per pool,
+        "taker_fee": fraction of each trade's output kept by the pool,
+        "precision": precision per asset,
+    }
+    """
+    pools = list(pool_cache)
+    assets = sorted(
+        {pool_cache[i][k] for i in pools for k in ["asset_a", "asset_b"]}
+    )
+    index = {asset: idx for idx, asset in enumerate(assets)}
+
+    def column(key, dtype):
+        return np.fromiter(
+            (pool_cache[i][key] or 0 for i in pools), dtype=dtype, count=len(pools)
+        )
+
+    return {
+        "pools": pools,
+        "assets": assets,
+        "asset_a": np.fromiter(
+            (index[pool_cache[i]["asset_a"]] for i in pools), np.intp, len(pools)
+        ),
+        "asset_b": np.fromiter(
+            (index[pool_cache[i]["asset_b"]] for i in pools), np.intp, len(pools)
+        ),
+        "balance_a": column("balance_a", np.float64),
+        "balance_b": column("balance_b", np.float64),
+        "volume": column("volume", np.float64),
+        "taker_fee": column("taker_fee", np.float64) / 10000,
+        "precision": np.array(
+            [name_cache[asset]["precision"] for asset in assets], dtype=np.float64
+        ),
+    }
+
+
+def ticker_column(columns, prices):
+    """
+    :return: the {asset_id: BTS price} prices aligned with columns["assets"]
+    """
+    return np.array([prices[asset] for asset in columns["assets"]], dtype=np.float64)
+
+
+def weight_columns(columns, ticker):
+    """
+    scale the amounts in each pool back to BTS core token to compare on equal terms
+    :param ticker: BTS price per asset, aligned with columns["assets"];
+        pass any other array to re-weight the same pools
+    :return: {"wt_balance", "wt_volume", "balance_a", "balance_b",
+        "price", "inverse"} arrays, one value per pool
+    """
+    asset_a, asset_b = columns["asset_a"], columns["asset_b"]
+    human_balance_a = columns["balance_a"] / 10 ** columns["precision"][asset_a]
+    human_balance_b = columns["balance_b"] / 10 ** columns["precision"][asset_b]
+    wt_balance = ticker[asset_a] * human_balance_a + ticker[asset_b] * human_balance_b
+    wt_volume = (
+        ticker[asset_a] * columns["volume"] / 10 ** columns["precision"][asset_a]
+    )
+    price = human_balance_a / (human_balance_b + NIL)
+    return {
+        "wt_balance": np.log1p(wt_balance),
+        "wt_volume": np.log1p(wt_volume),
+        "balance_a": human_balance_a,
+        "balance_b": human_balance_b,
+        "price": price,
+        "inverse": 1 / (price + NIL),
+    }
+
+
+def pool_weights(pool_cache, prices, name_cache, named_share_cache):
+    """
+    weight_columns as the list of edge weight dicts, one per pool
+    """
+    columns = pool_columns(pool_cache, name_cache)
+    arrays = {
+        key: value.tolist()
+        for key, value in weight_columns(
+            columns, ticker_column(columns, prices)
+        ).items()
+    }
+    return [
+        {
+            "asset_a": pool_cache[pool]["asset_a"],
+            "asset_b": pool_cache[pool]["asset_b"],
+            "wt_balance": arrays["wt_balance"][idx],
+            "wt_volume": arrays["wt_volume"][idx],
+            "pool_id": pool,
+            "pool_name": named_share_cache[pool_cache[pool]["share_asset"]]["symbol"],
+            "share_asset": pool_cache[pool]["share_asset"],
+            "balance_a": arrays["balance_a"][idx],
+            "balance_b": arrays["balance_b"][idx],
+            "price": arrays["price"][idx],
+            "inverse": arrays["inverse"][idx],
+            "taker_fee": (pool_cache[pool].get("taker_fee") or 0) / 10000,
+        }
+        for idx, pool in enumerate(columns["pools"])
+    ]